@@ -28,6 +28,10 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
 LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", "10"))
+# Seconds to reuse a reply for an identical message to the same tenant (0 disables)
+LLM_REPLY_CACHE_TTL = int(os.getenv("LLM_REPLY_CACHE_TTL", "600"))
+# Shorter messages ("yes", "ok") depend on the chat and are never served from the reply cache
+LLM_REPLY_CACHE_MIN_CHARS = int(os.getenv("LLM_REPLY_CACHE_MIN_CHARS", "12"))
 
 # Default system prompt if tenant doesn't have one
 DEFAULT_SYSTEM_PROMPT = os.getenv(
@@ -45,6 +49,8 @@ WEBSOCKET_ENABLED = os.getenv("WEBSOCKET_ENABLED", "false").lower() == "true"
 WEBSOCKET_MODE = os.getenv("WEBSOCKET_MODE", "global")  # "global" or "instance"
 EVOLUTION_SERVER_URL = os.getenv("EVOLUTION_SERVER_URL", "")  # For global WebSocket mode
 EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY", "")  # Global API key for WebSocket auth
+EVOLUTION_WS_TRANSPORT = os.getenv("EVOLUTION_WS_TRANSPORT", "socketio")  # "socketio" or "raw"
+EVOLUTION_WS_TRACE = os.getenv("EVOLUTION_WS_TRACE", "0") == "1"  # Log every received event
 
 # Message Delay Configuration (to avoid WhatsApp bans)
 # Adds human-like delays before sending messages
@@ -52,3 +58,9 @@ MESSAGE_DELAY_ENABLED = os.getenv("MESSAGE_DELAY_ENABLED", "true").lower() == "t
 MESSAGE_DELAY_MIN_MS = int(os.getenv("MESSAGE_DELAY_MIN_MS", "1000"))  # Minimum delay in ms
 MESSAGE_DELAY_MAX_MS = int(os.getenv("MESSAGE_DELAY_MAX_MS", "3000"))  # Maximum delay in ms
 TYPING_INDICATOR_ENABLED = os.getenv("TYPING_INDICATOR_ENABLED", "true").lower() == "true"
+# Send WebSocket replies sentence by sentence as the LLM streams them
+STREAM_REPLY_CHUNKS = os.getenv("STREAM_REPLY_CHUNKS", "false").lower() == "true"
+
+# Tenant config cache (L1 in-process, L2 Redis when REDIS_URL is set)
+REDIS_URL = os.getenv("REDIS_URL", "")
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", "300"))  # Seconds
@@ -4,8 +4,8 @@ Outputs JSON-formatted logs with contextual information.
 """
 
 import logging
-import json
 import sys
+import orjson
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
@@ -62,7 +62,7 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "extra_data"):
             log_data["extra"] = record.extra_data
 
-        return json.dumps(log_data, default=str)
+        return orjson.dumps(log_data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 
 def setup_logger(
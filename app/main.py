@@ -1,8 +1,10 @@
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
 import httpx
+import orjson
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 import time
 import asyncio
 import random
@@ -14,8 +16,10 @@ from .evolve_parse import (
     extract_text, extract_message_type
 )
 from .services.collision import should_pause_on_event, now_utc
-from .services.llm_client import get_llm_provider
-from .services.evolution_client import EvolutionClient, EvolutionAPIError
+from .services.llm_client import get_llm_provider, generate_cached_reply
+from .services.evolution_client import EvolutionClient, EvolutionAPIError, get_tenant_client
+from .services.tenant_cache import invalidate_tenant, forget_instance
+from .services.idempotency import claim_event, release_event
 from .config import (
     N8N_ENABLED, N8N_WEBHOOK_URL, N8N_API_KEY,
     DEFAULT_SYSTEM_PROMPT, LLM_PROVIDER, LOG_LEVEL, CRON_SECRET, CORS_ORIGINS,
@@ -25,7 +29,11 @@ from .config import (
 )
 from .logger import logger, log_info, log_warning, log_error, configure_logger_from_config
 from .services.evolution_websocket import EvolutionWebSocket, EvolutionWebSocketManager
-from .services.websocket_handler import handle_websocket_message, handle_websocket_connection_update
+from .services import pgrest_async
+from .services.websocket_handler import (
+    handle_websocket_message, handle_websocket_connection_update,
+    drain_scheduled_sends, flush_pending_events
+)
 
 # Configure logger with settings from config
 configure_logger_from_config()
@@ -108,7 +116,7 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Disconnect WebSocket connections on shutdown."""
+    """Disconnect WebSocket connections, flush queued writes and close shared HTTP clients on shutdown."""
     global websocket_manager
 
     if websocket_manager:
@@ -123,6 +131,43 @@ async def shutdown_event():
                 error_type=type(e).__name__,
             )
 
+    # Let delayed replies finish, then write processed events still queued
+    # by the WebSocket handler
+    await drain_scheduled_sends(timeout=MESSAGE_DELAY_MAX_MS / 1000.0 + 5)
+    await flush_pending_events()
+    await pgrest_async.close()
+
+    from .services.evolution_client import close as close_evolution_client
+    await close_evolution_client()
+
+    from .services.llm_providers._http import close_shared_http_client
+    await close_shared_http_client()
+
+
+def release_processed_event(tenant_id: int, message_id: str, event_type: str):
+    """
+    Delete an "in_flight" claim after processing failed, so a redelivery
+    of the same event is processed again.
+
+    Args:
+        tenant_id: Tenant ID
+        message_id: Message ID
+        event_type: Event type (e.g., "messages.upsert")
+    """
+    try:
+        supabase.table("processed_events").delete().eq(
+            "tenant_id", tenant_id
+        ).eq("message_id", message_id).eq(
+            "event_type", event_type
+        ).eq("action_taken", "in_flight").execute()
+    except Exception as e:
+        log_warning(
+            "Failed to release in_flight event claim",
+            tenant_id=tenant_id,
+            message_id=message_id,
+            error=str(e),
+        )
+
 
 # Helper function to record processed events for idempotency
 def record_processed_event(
@@ -132,7 +177,10 @@ def record_processed_event(
     action_taken: str
 ):
     """
-    Record a processed event to prevent duplicate processing.
+    Record the outcome of a processed event.
+
+    Upserts so it updates the "in_flight" row claimed by the webhook's
+    idempotency check (or inserts one if that claim was skipped).
 
     Args:
         tenant_id: Tenant ID
@@ -141,12 +189,12 @@ def record_processed_event(
         action_taken: Action that was taken (e.g., "paused", "ai_replied")
     """
     try:
-        supabase.table("processed_events").insert({
+        supabase.table("processed_events").upsert({
             "tenant_id": tenant_id,
             "message_id": message_id,
             "event_type": event_type,
             "action_taken": action_taken,
-        }).execute()
+        }, on_conflict="tenant_id,message_id,event_type").execute()
     except Exception as e:
         # Table might not exist yet or insert failed - log but don't crash
         log_warning(
@@ -288,6 +336,17 @@ async def health():
 
     return health_status
 
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint.
+
+    Exposes Evolution API latency/error metrics (evo_request_seconds,
+    evo_request_errors_total) for timeout and retry tuning.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/webhooks/evolution")
 async def evolution_webhook(req: Request):
     start_time = time.time()
@@ -323,9 +382,8 @@ async def evolution_webhook(req: Request):
 
                 log_info("Webhook signature verified", action="webhook_signature_valid")
 
-        import json
-        payload = json.loads(body)
-    except json.JSONDecodeError as e:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
         log_error(
             "Webhook received invalid JSON",
             error=str(e),
@@ -389,13 +447,33 @@ async def evolution_webhook(req: Request):
     if not chat_id or not msg_id:
         return {"ok": True, "note": "No chat_id or message_id"}
 
-    # 2) Idempotency check - prevent duplicate processing
-    try:
-        existing = supabase.table("processed_events").select("*").eq(
-            "tenant_id", tenant_id
-        ).eq("message_id", msg_id).eq("event_type", event).execute()
+    # 2a) Redis fast path: drop redeliveries without a database round-trip
+    if not await claim_event(instance, event, msg_id):
+        log_info(
+            "Duplicate webhook ignored - already claimed",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            message_id=msg_id,
+            event=event,
+            action="duplicate_ignored",
+        )
+        return {"ok": True, "action": "duplicate_ignored", "message_id": msg_id}
 
-        if existing.data and len(existing.data) > 0:
+    # 2b) Idempotency - atomically claim the event. The unique constraint on
+    # (tenant_id, message_id, event_type) rejects concurrent duplicates, so
+    # two deliveries of the same message can't both reach the LLM.
+    # record_processed_event() later overwrites "in_flight" with the outcome.
+    claimed = False
+    try:
+        supabase.table("processed_events").insert({
+            "tenant_id": tenant_id,
+            "message_id": msg_id,
+            "event_type": event,
+            "action_taken": "in_flight",
+        }).execute()
+        claimed = True
+    except Exception as e:
+        if getattr(e, "code", None) == "23505" or "duplicate key" in str(e).lower():
             log_info(
                 "Duplicate webhook ignored - already processed",
                 tenant_id=tenant_id,
@@ -405,7 +483,7 @@ async def evolution_webhook(req: Request):
                 action="duplicate_ignored",
             )
             return {"ok": True, "action": "duplicate_ignored", "message_id": msg_id}
-    except Exception as e:
+
         # Table might not exist yet - log but continue processing
         log_warning(
             "Idempotency check skipped - processed_events table may not exist",
@@ -414,33 +492,45 @@ async def evolution_webhook(req: Request):
             error=str(e),
         )
 
-    # 3) Upsert session
+    # 3) Upsert session. On owner action (collision rule) the pause is folded
+    # into the same upsert, and the returned row gives us is_paused without
+    # a follow-up select
+    should_pause = should_pause_on_event(event, from_me)
+    now_iso = now_utc().isoformat()
     session_row = {
         "tenant_id": tenant_id,
         "chat_id": chat_id,
-        "last_message_at": now_utc().isoformat()
+        "last_message_at": now_iso
     }
-    supabase.table("sessions").upsert(session_row, on_conflict="tenant_id,chat_id").execute()
+    if should_pause:
+        session_row["is_paused"] = True
+        session_row["pause_reason"] = "human_takeover"
+        session_row["last_human_at"] = now_iso
 
-    # 3) Store message (optional but recommended)
-    supabase.table("messages").upsert({
-        "tenant_id": tenant_id,
-        "chat_id": chat_id,
-        "message_id": msg_id,
-        "from_me": bool(from_me),
-        "message_type": msg_type,
-        "text": text,
-        "raw": payload
-    }, on_conflict="tenant_id,message_id").execute()
-
-    # 4) Collision rule: pause on owner action
-    if should_pause_on_event(event, from_me):
-        supabase.table("sessions").update({
-            "is_paused": True,
-            "pause_reason": "human_takeover",
-            "last_human_at": now_utc().isoformat()
-        }).eq("tenant_id", tenant_id).eq("chat_id", chat_id).execute()
+    try:
+        sess = supabase.table("sessions").upsert(session_row, on_conflict="tenant_id,chat_id").execute()
 
+        # 3) Store message (optional but recommended)
+        supabase.table("messages").upsert({
+            "tenant_id": tenant_id,
+            "chat_id": chat_id,
+            "message_id": msg_id,
+            "from_me": bool(from_me),
+            "message_type": msg_type,
+            "text": text,
+            "raw": payload
+        }, on_conflict="tenant_id,message_id").execute()
+    except Exception:
+        # Drop both claims so Evolution's redelivery is processed instead of
+        # being rejected as a duplicate. Without a processed_events claim
+        # (table missing) the Redis key is the only one and is released too.
+        if claimed:
+            release_processed_event(tenant_id, msg_id, event)
+        await release_event(instance, event, msg_id)
+        raise
+
+    # 4) Collision rule: pause on owner action (applied by the upsert above)
+    if should_pause:
         log_warning(
             "Session paused - human takeover",
             tenant_id=tenant_id,
@@ -454,15 +544,7 @@ async def evolution_webhook(req: Request):
 
         return {"ok": True, "action": "paused", "chat_id": chat_id}
 
-    # 5) Gate AI if paused
-    sess = (
-        supabase.table("sessions")
-        .select("is_paused, last_human_at")
-        .eq("tenant_id", tenant_id)
-        .eq("chat_id", chat_id)
-        .limit(1)
-        .execute()
-    )
+    # 5) Gate AI if paused (row returned by the session upsert)
     if sess.data and sess.data[0].get("is_paused") is True:
         log_info(
             "Message ignored - session paused",
@@ -479,9 +561,11 @@ async def evolution_webhook(req: Request):
 
     # 6) If inbound message and not paused → generate AI reply
     if from_me is False and event == "messages.upsert":
-        # Skip if no message text
+        # Skip if no message text (media without caption, stickers,
+        # reactions, ...) - nothing for the LLM to answer
         if not text or text.strip() == "":
-            return {"ok": True, "action": "no_text", "chat_id": chat_id}
+            record_processed_event(tenant_id, msg_id, event, "skipped_no_text")
+            return {"ok": True, "action": "skipped_no_text", "chat_id": chat_id}
 
         # Migration path: Check if n8n orchestration is enabled
         if N8N_ENABLED:
@@ -543,11 +627,10 @@ async def evolution_webhook(req: Request):
             # Direct LLM call (MVP mode)
             llm_start_time = time.time()
             try:
-                evolution_client = EvolutionClient()
+                evolution_client = get_tenant_client(tenant_id)
+                show_typing = TYPING_INDICATOR_ENABLED and not is_lid_contact
 
-                # Mark message as read before processing (show blue checkmarks)
-                # Skip for @lid contacts as Evolution API can't validate them
-                if not is_lid_contact:
+                async def mark_read():
                     try:
                         await evolution_client.mark_as_read(
                             tenant_id=tenant_id,
@@ -571,9 +654,7 @@ async def evolution_webhook(req: Request):
                             action="mark_read_failed",
                         )
 
-                # Send typing indicator (composing) before generating reply
-                # Skip for @lid contacts as Evolution API can't validate them
-                if TYPING_INDICATOR_ENABLED and not is_lid_contact:
+                async def start_typing():
                     try:
                         await evolution_client.send_presence(
                             tenant_id=tenant_id,
@@ -596,6 +677,15 @@ async def evolution_webhook(req: Request):
                             action="typing_failed",
                         )
 
+                # Mark message as read (blue checkmarks) and show typing while the
+                # reply is generated - both run concurrently with the LLM call.
+                # Skip for @lid contacts as Evolution API can't validate them
+                pre_tasks = []
+                if not is_lid_contact:
+                    pre_tasks.append(mark_read())
+                if show_typing:
+                    pre_tasks.append(start_typing())
+
                 # Get tenant's system prompt and LLM provider
                 system_prompt = tenant.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
                 provider_name = tenant.get("llm_provider") or LLM_PROVIDER
@@ -609,11 +699,11 @@ async def evolution_webhook(req: Request):
                     action="ai_generate_start",
                 )
 
-                # Generate AI reply
+                # Generate AI reply (pre-tasks log their own failures)
                 llm_provider = get_llm_provider(provider_name)
-                reply_text = await llm_provider.generate_reply(
-                    message=text,
-                    system_prompt=system_prompt,
+                reply_text, *_ = await asyncio.gather(
+                    generate_cached_reply(llm_provider, tenant_id, text, system_prompt),
+                    *pre_tasks,
                 )
 
                 llm_duration = int((time.time() - llm_start_time) * 1000)
@@ -637,7 +727,7 @@ async def evolution_webhook(req: Request):
                     delay_seconds = delay_ms / 1000.0
 
                     # Refresh typing indicator during delay (skip for @lid contacts)
-                    if TYPING_INDICATOR_ENABLED and not is_lid_contact:
+                    if show_typing:
                         try:
                             await evolution_client.send_presence(
                                 tenant_id=tenant_id,
@@ -675,7 +765,7 @@ async def evolution_webhook(req: Request):
                 )
 
                 # Stop typing indicator after sending (skip for @lid contacts)
-                if TYPING_INDICATOR_ENABLED and not is_lid_contact:
+                if show_typing:
                     try:
                         await evolution_client.send_presence(
                             tenant_id=tenant_id,
@@ -768,7 +858,11 @@ async def evolution_webhook(req: Request):
                     "chat_id": chat_id
                 }
 
-    return {"ok": True}
+    # Own message that doesn't pause, or a non-upsert event: nothing to
+    # reply to, but the in_flight claim still needs a final action
+    record_processed_event(tenant_id, msg_id, event, "stored")
+
+    return {"ok": True, "action": "stored", "chat_id": chat_id}
     
 
 # ============================================================================
@@ -1084,6 +1178,8 @@ async def create_tenant(
             raise HTTPException(status_code=500, detail="Failed to create tenant")
 
         tenant = tenant_result.data[0]
+        # The instance may be cached as unknown from an earlier WebSocket event
+        forget_instance(tenant["instance_name"])
 
         # Create user_tenants relationship (owner role)
         supabase.table("user_tenants").insert({
@@ -1272,6 +1368,8 @@ async def update_tenant(
         if not result.data:
             raise HTTPException(status_code=404, detail="Tenant not found")
 
+        await invalidate_tenant(tenant_id)
+
         log_info(
             "Tenant updated",
             action="update_tenant",
@@ -1295,6 +1393,36 @@ async def update_tenant(
         raise HTTPException(status_code=500, detail=f"Failed to update tenant: {str(e)}")
 
 
+@app.post("/api/tenants/{tenant_id}/invalidate-cache")
+async def invalidate_tenant_cache(
+    tenant_id: int,
+    user: dict = Depends(get_current_user),
+    _: None = Depends(require_tenant_access("owner"))
+):
+    """
+    Drop cached tenant configuration (in-process and Redis).
+
+    Use after editing a tenant directly in the database so workers
+    pick up the change before the cache TTL expires.
+
+    Args:
+        tenant_id: Tenant ID
+
+    Returns:
+        {"ok": true, "tenant_id": <id>}
+    """
+    await invalidate_tenant(tenant_id)
+
+    log_info(
+        "Tenant cache invalidated",
+        action="invalidate_tenant_cache",
+        tenant_id=tenant_id,
+        user_id=user["id"],
+    )
+
+    return {"ok": True, "tenant_id": tenant_id}
+
+
 # ============================================================================
 # INSTANCE MANAGEMENT APIs
 # ============================================================================
@@ -2335,6 +2463,8 @@ async def whatsapp_connect(
             raise HTTPException(status_code=500, detail="Failed to create connection record")
 
         tenant = tenant_result.data[0]
+        # The instance may be cached as unknown from an earlier WebSocket event
+        forget_instance(tenant["instance_name"])
 
         # Create user_tenants relationship (owner role)
         supabase.table("user_tenants").insert({
@@ -2597,6 +2727,7 @@ async def delete_whatsapp_instance(
 
         # Delete tenant record
         supabase.table("tenants").delete().eq("id", tenant["id"]).execute()
+        await invalidate_tenant(tenant["id"])
 
         log_info(
             "WhatsApp connection deleted",
@@ -2897,6 +3028,9 @@ async def delete_user_data(
             ).execute()
             deleted_summary["tenants_deleted"] = len(tenants_result.data or [])
 
+            for owned_tenant_id in owned_tenant_ids:
+                await invalidate_tenant(owned_tenant_id)
+
         # Delete user's own memberships (for tenants they don't own)
         memberships_result = supabase.table("user_tenants").delete().eq(
             "user_id", user_id
@@ -2,9 +2,133 @@
 Evolution API client for sending WhatsApp messages.
 This client can be used directly by FastAPI or called via API endpoints by n8n.
 """
+import time
+import asyncio
 import httpx
-from typing import Optional, Dict, Any
+import orjson
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple
+from prometheus_client import Histogram, Counter
 from ..db import supabase
+from . import tenant_cache
+
+# Fail fast on TCP connect (dead/unreachable instance) while still tolerating
+# slow Evolution API responses
+_SEND_TIMEOUT = httpx.Timeout(connect=2.0, read=10.0, write=5.0, pool=1.0)
+# Instance lifecycle calls (create, QR, delete) can take a while server-side
+_LIFECYCLE_TIMEOUT = httpx.Timeout(connect=2.0, read=30.0, write=5.0, pool=1.0)
+# Read receipts and presence are non-critical - don't wait long for them
+_NON_CRITICAL_TIMEOUT = httpx.Timeout(connect=2.0, read=3.0, write=5.0, pool=1.0)
+
+# One HTTP/2 connection pool shared by all EvolutionClient instances so the
+# reply path's read receipt, presence and send calls multiplex over the same
+# connection instead of each opening its own; timeouts are set per request
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared Evolution API HTTP client, creating it on first use."""
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+        )
+
+    return _http_client
+
+
+async def close():
+    """Close the shared HTTP client (call on app shutdown)."""
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# create_instance payload is a fixed shape - preserialize the static parts and
+# only splice in instanceName / webhook.url per call
+_CREATE_PREFIX = orjson.dumps({
+    "integration": "WHATSAPP-BAILEYS",
+    "qrcode": True,
+})[:-1]  # strip trailing }
+_WEBHOOK_SUFFIX = orjson.dumps({
+    "byEvents": False,
+    "base64": False,
+    "events": [
+        "MESSAGES_UPSERT",
+        "CONNECTION_UPDATE",
+        "MESSAGES_UPDATE"
+    ]
+})[1:]  # strip leading {
+
+# Per-endpoint latency/error metrics - use the p95 of evo_request_seconds to
+# tune the read timeouts above
+EVO_LATENCY = Histogram(
+    "evo_request_seconds",
+    "Evolution API request latency in seconds",
+    ["endpoint", "outcome"],
+)
+EVO_ERRORS = Counter(
+    "evo_request_errors_total",
+    "Evolution API request failures",
+    ["endpoint", "outcome"],
+)
+
+
+@contextmanager
+def _observe(endpoint: str):
+    """Record latency and outcome of one Evolution API call."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except httpx.TimeoutException:
+        outcome = "timeout"
+        raise
+    except httpx.HTTPStatusError as e:
+        outcome = f"http_{e.response.status_code}"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        EVO_LATENCY.labels(endpoint, outcome).observe(time.perf_counter() - start)
+        if outcome != "ok":
+            EVO_ERRORS.labels(endpoint, outcome).inc()
+
+
+# Connection-state lookups shared across client instances (callers build a new
+# EvolutionClient per request). Concurrent identical requests await the same
+# in-flight task, and results are reused for a short window to absorb polling.
+_STATE_INFLIGHT: Dict[str, asyncio.Task] = {}
+_STATE_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_STATE_CACHE_TTL = 2.0
+
+
+def _on_state_done(key: str, task: asyncio.Task):
+    _STATE_INFLIGHT.pop(key, None)
+    if not task.cancelled() and task.exception() is None:
+        _STATE_CACHE[key] = (time.monotonic() + _STATE_CACHE_TTL, task.result())
+
+
+async def _single_flight(key: str, fetch) -> Dict[str, Any]:
+    """Run fetch() once per key, sharing the result with concurrent callers."""
+    cached = _STATE_CACHE.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    task = _STATE_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _STATE_INFLIGHT[key] = task
+        task.add_done_callback(lambda t: _on_state_done(key, t))
+
+    # Shield so one cancelled caller doesn't cancel the request for the others
+    return await asyncio.shield(task)
 
 
 class EvolutionAPIError(Exception):
@@ -21,7 +145,11 @@ class EvolutionClient:
         self.global_api_key = global_api_key
 
     async def _get_tenant_config(self, tenant_id: int) -> Dict[str, Any]:
-        """Fetch tenant Evolution API configuration from database"""
+        """Fetch tenant Evolution API configuration (cached, falls back to database)"""
+        cached = await tenant_cache.get_tenant_config(tenant_id)
+        if cached is not None:
+            return cached
+
         result = supabase.table("tenants").select(
             "evo_server_url, evo_api_key, instance_name"
         ).eq("id", tenant_id).limit(1).execute()
@@ -29,7 +157,9 @@ class EvolutionClient:
         if not result.data:
             raise ValueError(f"Tenant {tenant_id} not found")
 
-        return result.data[0]
+        config = result.data[0]
+        await tenant_cache.set_tenant_config(tenant_id, config)
+        return config
 
     async def send_text_message(
         self,
@@ -105,49 +235,51 @@ class EvolutionClient:
 
         # Send request - use short timeout since Evolution API may not respond
         # even when message sends successfully (known issue)
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
+        client = _get_http_client()
+        try:
+            with _observe("send_text"):
                 response = await client.post(
                     endpoint,
-                    json=payload,
-                    headers=headers
+                    content=orjson.dumps(payload),
+                    headers=headers,
+                    timeout=_SEND_TIMEOUT
                 )
                 response.raise_for_status()
 
-                result = response.json()
-
-                # Check if Evolution API returned an error in response body
-                if isinstance(result, dict) and result.get("error"):
-                    raise EvolutionAPIError(f"Evolution API error: {result.get('message', 'Unknown error')}")
-
-                return result
-
-            except httpx.HTTPStatusError as e:
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-
-                raise EvolutionAPIError(
-                    f"Evolution API HTTP {e.response.status_code}: {error_detail}"
-                ) from e
-
-            except httpx.TimeoutException:
-                # Evolution API often doesn't respond even when message sends successfully
-                # Return success assuming message was sent (fire-and-forget)
-                return {
-                    "status": "sent_no_confirmation",
-                    "message": "Message likely sent (Evolution API did not respond in time)",
-                    "number": number,
-                    "instance": instance
-                }
+            result = response.json()
+
+            # Check if Evolution API returned an error in response body
+            if isinstance(result, dict) and result.get("error"):
+                raise EvolutionAPIError(f"Evolution API error: {result.get('message', 'Unknown error')}")
+
+            return result
+
+        except httpx.HTTPStatusError as e:
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+
+            raise EvolutionAPIError(
+                f"Evolution API HTTP {e.response.status_code}: {error_detail}"
+            ) from e
+
+        except httpx.TimeoutException:
+            # Evolution API often doesn't respond even when message sends successfully
+            # Return success assuming message was sent (fire-and-forget)
+            return {
+                "status": "sent_no_confirmation",
+                "message": "Message likely sent (Evolution API did not respond in time)",
+                "number": number,
+                "instance": instance
+            }
 
-            except httpx.RequestError as e:
-                raise EvolutionAPIError(
-                    f"Evolution API request failed: {str(e)}"
-                ) from e
+        except httpx.RequestError as e:
+            raise EvolutionAPIError(
+                f"Evolution API request failed: {str(e)}"
+            ) from e
 
     async def get_instance_status(
         self,
@@ -175,16 +307,26 @@ class EvolutionClient:
         if evo_api_key:
             headers["apikey"] = evo_api_key
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(endpoint, headers=headers)
+        return await _single_flight(
+            endpoint, lambda: self._fetch_instance_status(endpoint, headers)
+        )
+
+    async def _fetch_instance_status(self, endpoint: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        client = _get_http_client()
+        try:
+            with _observe("instance_status"):
+                response = await client.get(
+                    endpoint,
+                    headers=headers,
+                    timeout=httpx.Timeout(self.timeout, connect=2.0)
+                )
                 response.raise_for_status()
-                return response.json()
+            return response.json()
 
-            except httpx.HTTPError as e:
-                raise EvolutionAPIError(
-                    f"Failed to get instance status: {str(e)}"
-                ) from e
+        except httpx.HTTPError as e:
+            raise EvolutionAPIError(
+                f"Failed to get instance status: {str(e)}"
+            ) from e
 
     async def mark_as_read(
         self,
@@ -228,40 +370,42 @@ class EvolutionClient:
             ]
         }
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
+        client = _get_http_client()
+        try:
+            with _observe("mark_as_read"):
                 response = await client.post(
                     endpoint,
-                    json=payload,
-                    headers=headers
+                    content=orjson.dumps(payload),
+                    headers=headers,
+                    timeout=_NON_CRITICAL_TIMEOUT
                 )
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                # Don't raise error for mark as read - it's not critical
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                return {
-                    "status": "failed",
-                    "error": f"HTTP {e.response.status_code}: {error_detail}"
-                }
+            return response.json()
 
-            except httpx.TimeoutException:
-                return {
-                    "status": "timeout",
-                    "message": "Mark as read request timed out"
-                }
+        except httpx.HTTPStatusError as e:
+            # Don't raise error for mark as read - it's not critical
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            return {
+                "status": "failed",
+                "error": f"HTTP {e.response.status_code}: {error_detail}"
+            }
 
-            except httpx.RequestError as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        except httpx.TimeoutException:
+            return {
+                "status": "timeout",
+                "message": "Mark as read request timed out"
+            }
+
+        except httpx.RequestError as e:
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
 
     async def send_presence(
         self,
@@ -311,40 +455,42 @@ class EvolutionClient:
             "presence": presence
         }
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
+        client = _get_http_client()
+        try:
+            with _observe("send_presence"):
                 response = await client.post(
                     endpoint,
-                    json=payload,
-                    headers=headers
+                    content=orjson.dumps(payload),
+                    headers=headers,
+                    timeout=_NON_CRITICAL_TIMEOUT
                 )
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                # Don't raise error for presence - it's not critical
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                return {
-                    "status": "failed",
-                    "error": f"HTTP {e.response.status_code}: {error_detail}"
-                }
+            return response.json()
 
-            except httpx.TimeoutException:
-                return {
-                    "status": "timeout",
-                    "message": "Send presence request timed out"
-                }
+        except httpx.HTTPStatusError as e:
+            # Don't raise error for presence - it's not critical
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            return {
+                "status": "failed",
+                "error": f"HTTP {e.response.status_code}: {error_detail}"
+            }
 
-            except httpx.RequestError as e:
-                return {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        except httpx.TimeoutException:
+            return {
+                "status": "timeout",
+                "message": "Send presence request timed out"
+            }
+
+        except httpx.RequestError as e:
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
 
     async def create_instance(
         self,
@@ -372,50 +518,41 @@ class EvolutionClient:
         if self.global_api_key:
             headers["apikey"] = self.global_api_key
 
-        payload = {
-            "instanceName": instance_name,
-            "integration": "WHATSAPP-BAILEYS",
-            "qrcode": True,
-        }
+        body = _CREATE_PREFIX + b',"instanceName":' + orjson.dumps(instance_name)
 
         # Add webhook configuration if provided
         if webhook_url:
-            payload["webhook"] = {
-                "url": webhook_url,
-                "byEvents": False,
-                "base64": False,
-                "events": [
-                    "MESSAGES_UPSERT",
-                    "CONNECTION_UPDATE",
-                    "MESSAGES_UPDATE"
-                ]
-            }
+            body += b',"webhook":{"url":' + orjson.dumps(webhook_url) + b"," + _WEBHOOK_SUFFIX
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
+        body += b"}"
+
+        client = _get_http_client()
+        try:
+            with _observe("create_instance"):
                 response = await client.post(
                     endpoint,
-                    json=payload,
-                    headers=headers
+                    content=body,
+                    headers=headers,
+                    timeout=_LIFECYCLE_TIMEOUT
                 )
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                raise EvolutionAPIError(
-                    f"Failed to create instance: HTTP {e.response.status_code}: {error_detail}"
-                ) from e
-
-            except httpx.RequestError as e:
-                raise EvolutionAPIError(
-                    f"Failed to create instance: {str(e)}"
-                ) from e
+            return response.json()
+
+        except httpx.HTTPStatusError as e:
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            raise EvolutionAPIError(
+                f"Failed to create instance: HTTP {e.response.status_code}: {error_detail}"
+            ) from e
+
+        except httpx.RequestError as e:
+            raise EvolutionAPIError(
+                f"Failed to create instance: {str(e)}"
+            ) from e
 
     async def get_qr_code(
         self,
@@ -439,27 +576,28 @@ class EvolutionClient:
         if self.global_api_key:
             headers["apikey"] = self.global_api_key
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(endpoint, headers=headers)
+        client = _get_http_client()
+        try:
+            with _observe("get_qr_code"):
+                response = await client.get(endpoint, headers=headers, timeout=_LIFECYCLE_TIMEOUT)
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                raise EvolutionAPIError(
-                    f"Failed to get QR code: HTTP {e.response.status_code}: {error_detail}"
-                ) from e
-
-            except httpx.RequestError as e:
-                raise EvolutionAPIError(
-                    f"Failed to get QR code: {str(e)}"
-                ) from e
+            return response.json()
+
+        except httpx.HTTPStatusError as e:
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            raise EvolutionAPIError(
+                f"Failed to get QR code: HTTP {e.response.status_code}: {error_detail}"
+            ) from e
+
+        except httpx.RequestError as e:
+            raise EvolutionAPIError(
+                f"Failed to get QR code: {str(e)}"
+            ) from e
 
     async def get_connection_state(
         self,
@@ -483,27 +621,33 @@ class EvolutionClient:
         if self.global_api_key:
             headers["apikey"] = self.global_api_key
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(endpoint, headers=headers)
+        return await _single_flight(
+            endpoint, lambda: self._fetch_connection_state(endpoint, headers)
+        )
+
+    async def _fetch_connection_state(self, endpoint: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        client = _get_http_client()
+        try:
+            with _observe("connection_state"):
+                response = await client.get(endpoint, headers=headers, timeout=_SEND_TIMEOUT)
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                raise EvolutionAPIError(
-                    f"Failed to get connection state: HTTP {e.response.status_code}: {error_detail}"
-                ) from e
-
-            except httpx.RequestError as e:
-                raise EvolutionAPIError(
-                    f"Failed to get connection state: {str(e)}"
-                ) from e
+            return response.json()
+
+        except httpx.HTTPStatusError as e:
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            raise EvolutionAPIError(
+                f"Failed to get connection state: HTTP {e.response.status_code}: {error_detail}"
+            ) from e
+
+        except httpx.RequestError as e:
+            raise EvolutionAPIError(
+                f"Failed to get connection state: {str(e)}"
+            ) from e
 
     async def delete_instance(
         self,
@@ -527,24 +671,42 @@ class EvolutionClient:
         if self.global_api_key:
             headers["apikey"] = self.global_api_key
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.delete(endpoint, headers=headers)
+        client = _get_http_client()
+        try:
+            with _observe("delete_instance"):
+                response = await client.delete(endpoint, headers=headers, timeout=_LIFECYCLE_TIMEOUT)
                 response.raise_for_status()
-                return response.json()
-
-            except httpx.HTTPStatusError as e:
-                error_detail = "Unknown error"
-                try:
-                    error_body = e.response.json()
-                    error_detail = error_body.get("message", str(error_body))
-                except:
-                    error_detail = e.response.text
-                raise EvolutionAPIError(
-                    f"Failed to delete instance: HTTP {e.response.status_code}: {error_detail}"
-                ) from e
-
-            except httpx.RequestError as e:
-                raise EvolutionAPIError(
-                    f"Failed to delete instance: {str(e)}"
-                ) from e
+            return response.json()
+
+        except httpx.HTTPStatusError as e:
+            error_detail = "Unknown error"
+            try:
+                error_body = e.response.json()
+                error_detail = error_body.get("message", str(error_body))
+            except:
+                error_detail = e.response.text
+            raise EvolutionAPIError(
+                f"Failed to delete instance: HTTP {e.response.status_code}: {error_detail}"
+            ) from e
+
+        except httpx.RequestError as e:
+            raise EvolutionAPIError(
+                f"Failed to delete instance: {str(e)}"
+            ) from e
+
+
+# Reused per tenant so inbound reply paths don't build a client per event
+_EVO_CLIENTS: Dict[int, EvolutionClient] = {}
+
+
+def get_tenant_client(tenant_id: int) -> EvolutionClient:
+    """Return the shared EvolutionClient for a tenant, creating it on first use."""
+    client = _EVO_CLIENTS.get(tenant_id)
+    if client is None:
+        client = _EVO_CLIENTS[tenant_id] = EvolutionClient()
+    return client
+
+
+def drop_tenant_client(tenant_id: int):
+    """Forget a tenant's client (e.g. when its instance disconnects)."""
+    _EVO_CLIENTS.pop(tenant_id, None)
@@ -19,12 +19,57 @@ Usage:
 """
 
 import asyncio
+import functools
+import orjson
 import socketio
+import time
+from collections import defaultdict
 from typing import Optional, Callable, Dict, Any
-from datetime import datetime, timezone
 
+from ..config import EVOLUTION_WS_TRANSPORT, EVOLUTION_WS_TRACE
 from ..logger import log_info, log_error, log_warning
 
+# Seconds between batched event-count summaries
+_EVENT_SUMMARY_INTERVAL = 5.0
+
+# aiohttp session shared by all socketio clients so TCP/TLS setup is
+# reused across reconnects instead of engineio creating its own
+_http_session = None
+
+
+def _get_http_session():
+    """Lazily create the shared aiohttp session (must run inside the event loop)."""
+    global _http_session
+
+    if _http_session is None or _http_session.closed:
+        import aiohttp
+
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(keepalive_timeout=75),
+        )
+
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared aiohttp session (call on shutdown)."""
+    global _http_session
+
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+def _make_awaiter(fn: Callable) -> Callable:
+    """Return fn as an async callable, checking sync vs async only once."""
+    if asyncio.iscoroutinefunction(fn):
+        return fn
+
+    async def call_sync(*args):
+        fn(*args)
+
+    return call_sync
+
 
 class EvolutionWebSocket:
     """Socket.IO client for Evolution API real-time events."""
@@ -56,35 +101,75 @@ class EvolutionWebSocket:
         self.server_url = server_url.rstrip('/')
         self.instance_name = instance_name
         self.api_key = api_key
+
+        if instance_name:
+            # Traditional mode - connect to specific instance
+            self._url = f"{self.server_url}/{instance_name}"
+        else:
+            # Global mode - receive events from all instances
+            self._url = self.server_url
         self.on_message = on_message
         self.on_connection_update = on_connection_update
         self.on_any_event = on_any_event
         self.reconnect = reconnect
         self.reconnect_delay = reconnect_delay
 
+        # Event routing resolved once: event -> awaitable callback
+        self._cb_table: Dict[str, Callable] = {}
+        if on_message:
+            message_cb = _make_awaiter(on_message)
+            self._cb_table["messages.upsert"] = message_cb
+            self._cb_table["message"] = message_cb
+        if on_connection_update:
+            self._cb_table["connection.update"] = _make_awaiter(on_connection_update)
+        self._any_cb = _make_awaiter(on_any_event) if on_any_event else None
+
+        # Log context computed once and reused by every log call
+        self._instance_label = instance_name or "global"
+        self._log_base = {"server_url": self.server_url, "instance": self._instance_label}
+        self._log_base_event = {"instance": self._instance_label, "action": "websocket_event"}
+
         self._connected = False
         self._should_reconnect = True
 
+        # Per-event logging only when tracing; otherwise just count and
+        # emit one summary every _EVENT_SUMMARY_INTERVAL seconds
+        self._trace = EVOLUTION_WS_TRACE
+        self._event_counts: Dict[str, int] = defaultdict(int)
+        self._summary_task: Optional[asyncio.Task] = None
+
         # Create Socket.IO client with WebSocket transport
-        self.sio = socketio.AsyncClient(
-            reconnection=reconnect,
-            reconnection_delay=reconnect_delay,
-            reconnection_delay_max=30,
-            logger=False,
-            engineio_logger=False,
-        )
+        if EVOLUTION_WS_TRANSPORT == "raw":
+            # Lightweight websockets + orjson receive path (no Engine.IO stack)
+            from .raw_socketio import RawSocketIOClient
+
+            self.sio = RawSocketIOClient(
+                reconnection=reconnect,
+                reconnection_delay=reconnect_delay,
+                reconnection_delay_max=30,
+            )
+        else:
+            self.sio = socketio.AsyncClient(
+                reconnection=reconnect,
+                reconnection_delay=reconnect_delay,
+                reconnection_delay_max=30,
+                logger=False,
+                engineio_logger=False,
+                http_session=_get_http_session(),
+            )
 
         # Register event handlers
         self._register_handlers()
 
+    def set_message_handler(self, handler: Callable):
+        """Replace the message callback (e.g. with one pre-bound to this connection)."""
+        message_cb = _make_awaiter(handler)
+        self._cb_table["messages.upsert"] = message_cb
+        self._cb_table["message"] = message_cb
+
     def _get_connection_url(self) -> str:
-        """Get the WebSocket connection URL."""
-        if self.instance_name:
-            # Traditional mode - connect to specific instance
-            return f"{self.server_url}/{self.instance_name}"
-        else:
-            # Global mode - receive events from all instances
-            return self.server_url
+        """Get the WebSocket connection URL (built once in __init__)."""
+        return self._url
 
     def _register_handlers(self):
         """Register Socket.IO event handlers."""
@@ -94,8 +179,7 @@ class EvolutionWebSocket:
             self._connected = True
             log_info(
                 "WebSocket connected to Evolution API",
-                server_url=self.server_url,
-                instance=self.instance_name or "global",
+                **self._log_base,
                 action="websocket_connected",
             )
 
@@ -104,8 +188,7 @@ class EvolutionWebSocket:
             self._connected = False
             log_warning(
                 "WebSocket disconnected from Evolution API",
-                server_url=self.server_url,
-                instance=self.instance_name or "global",
+                **self._log_base,
                 action="websocket_disconnected",
             )
 
@@ -113,8 +196,7 @@ class EvolutionWebSocket:
         async def connect_error(data):
             log_error(
                 "WebSocket connection error",
-                server_url=self.server_url,
-                instance=self.instance_name or "global",
+                **self._log_base,
                 error=str(data),
                 action="websocket_error",
             )
@@ -155,20 +237,24 @@ class EvolutionWebSocket:
 
     async def _handle_event(self, event: str, data: Any):
         """Handle incoming events."""
-        log_info(
-            f"WebSocket event received: {event}",
-            event=event,
-            instance=self.instance_name or "global",
-            action="websocket_event",
-        )
+        if not self._should_reconnect:
+            # Shutting down - don't start new work
+            return
+
+        self._event_counts[event] += 1
+        if self._trace:
+            # Log payload size, not the payload - avoids re-serializing it per log call
+            log_info(
+                "ws_event",
+                event=event,
+                extra_data={"data_size": len(orjson.dumps(data, default=str))},
+                **self._log_base_event,
+            )
 
         # Call the any-event callback if set
-        if self.on_any_event:
+        if self._any_cb is not None:
             try:
-                if asyncio.iscoroutinefunction(self.on_any_event):
-                    await self.on_any_event(event, data)
-                else:
-                    self.on_any_event(event, data)
+                await self._any_cb(event, data)
             except Exception as e:
                 log_error(
                     f"Error in on_any_event callback: {e}",
@@ -176,32 +262,19 @@ class EvolutionWebSocket:
                     error_type=type(e).__name__,
                 )
 
-        # Route to specific callbacks
-        if event in ("messages.upsert", "message") and self.on_message:
-            try:
-                if asyncio.iscoroutinefunction(self.on_message):
-                    await self.on_message(data)
-                else:
-                    self.on_message(data)
-            except Exception as e:
-                log_error(
-                    f"Error in on_message callback: {e}",
-                    event=event,
-                    error_type=type(e).__name__,
-                )
+        # Route to specific callback
+        callback = self._cb_table.get(event)
+        if callback is None:
+            return
 
-        elif event == "connection.update" and self.on_connection_update:
-            try:
-                if asyncio.iscoroutinefunction(self.on_connection_update):
-                    await self.on_connection_update(data)
-                else:
-                    self.on_connection_update(data)
-            except Exception as e:
-                log_error(
-                    f"Error in on_connection_update callback: {e}",
-                    event=event,
-                    error_type=type(e).__name__,
-                )
+        try:
+            await callback(data)
+        except Exception as e:
+            log_error(
+                f"Error in {event} callback: {e}",
+                event=event,
+                error_type=type(e).__name__,
+            )
 
     async def connect(self):
         """Connect to Evolution API WebSocket."""
@@ -210,7 +283,7 @@ class EvolutionWebSocket:
         log_info(
             "Connecting to Evolution API WebSocket",
             url=url,
-            instance=self.instance_name or "global",
+            instance=self._instance_label,
             action="websocket_connecting",
         )
 
@@ -226,6 +299,9 @@ class EvolutionWebSocket:
                 headers=headers if headers else None,
             )
 
+            if self._summary_task is None:
+                self._summary_task = asyncio.create_task(self._flush_event_counts())
+
         except Exception as e:
             log_error(
                 f"Failed to connect to Evolution API WebSocket: {e}",
@@ -238,12 +314,39 @@ class EvolutionWebSocket:
     async def disconnect(self):
         """Disconnect from Evolution API WebSocket."""
         self._should_reconnect = False
-        if self._connected:
-            await self.sio.disconnect()
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+            self._summary_task = None
+
+        if not (self._connected or self.sio.connected):
+            # Already closed (e.g. server-side) - only stop a pending reconnect loop
+            if self.reconnect:
+                await self.sio.shutdown()
+            return
+
+        await self.sio.disconnect()
+        log_info(
+            "Disconnected from Evolution API WebSocket",
+            action="websocket_manual_disconnect",
+        )
+
+    async def _flush_event_counts(self):
+        """Periodically log one summary of received event counts."""
+        window_start = time.monotonic_ns()
+        while True:
+            await asyncio.sleep(_EVENT_SUMMARY_INTERVAL)
+            if not self._event_counts:
+                continue
+            now = time.monotonic_ns()
+            counts = dict(self._event_counts)
+            self._event_counts.clear()
             log_info(
-                "Disconnected from Evolution API WebSocket",
-                action="websocket_manual_disconnect",
+                "ws_event_summary",
+                instance=self._instance_label,
+                action="websocket_event_summary",
+                extra_data={"counts": counts, "window_ms": (now - window_start) // 1_000_000},
             )
+            window_start = now
 
     @property
     def connected(self) -> bool:
@@ -282,19 +385,22 @@ class EvolutionWebSocketManager:
         api_key: Optional[str] = None,
     ) -> EvolutionWebSocket:
         """Connect to a specific instance."""
-        if instance_name in self.connections:
-            if self.connections[instance_name].connected:
-                return self.connections[instance_name]
+        existing = self.connections.get(instance_name)
+        if existing is not None:
+            if existing.connected:
+                return existing
             # Disconnect old connection
-            await self.connections[instance_name].disconnect()
+            await existing.disconnect()
 
         ws = EvolutionWebSocket(
             server_url=server_url,
             instance_name=instance_name,
             api_key=api_key,
-            on_message=self._message_handler,
             on_connection_update=self._connection_handler,
         )
+        if self._message_handler:
+            # Pre-bind the owning connection so the handler gets it directly
+            ws.set_message_handler(functools.partial(self._message_handler, _ws=ws))
 
         await ws.connect()
         self.connections[instance_name] = ws
@@ -306,10 +412,11 @@ class EvolutionWebSocketManager:
         api_key: Optional[str] = None,
     ) -> EvolutionWebSocket:
         """Connect in global mode (all instances)."""
-        if "global" in self.connections:
-            if self.connections["global"].connected:
-                return self.connections["global"]
-            await self.connections["global"].disconnect()
+        existing = self.connections.get("global")
+        if existing is not None:
+            if existing.connected:
+                return existing
+            await existing.disconnect()
 
         ws = EvolutionWebSocket(
             server_url=server_url,
@@ -324,16 +431,20 @@ class EvolutionWebSocketManager:
         return ws
 
     async def disconnect_all(self):
-        """Disconnect all connections."""
-        for name, ws in self.connections.items():
-            try:
-                await ws.disconnect()
-            except Exception as e:
-                log_error(f"Error disconnecting {name}: {e}")
+        """Disconnect all connections concurrently."""
+        names = list(self.connections)
+        results = await asyncio.gather(
+            *(ws.disconnect() for ws in self.connections.values()),
+            return_exceptions=True,
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                log_error(f"Error disconnecting {name}: {result}")
         self.connections.clear()
+        await close_http_session()
 
     async def disconnect_instance(self, instance_name: str):
         """Disconnect a specific instance."""
-        if instance_name in self.connections:
-            await self.connections[instance_name].disconnect()
-            del self.connections[instance_name]
+        ws = self.connections.pop(instance_name, None)
+        if ws is not None:
+            await ws.disconnect()
@@ -0,0 +1,47 @@
+"""
+Redis fast path for event idempotency.
+
+A SET NX on idem:{instance}:{event}:{message_id} (24h TTL) rejects duplicate
+deliveries in one Redis round-trip, before any database work. Postgres
+(processed_events) remains the durable record; when Redis is disabled or
+unavailable every event is let through to the database check.
+"""
+
+from ..logger import log_warning
+from .redis_client import get_redis
+
+IDEMPOTENCY_TTL = 24 * 60 * 60
+
+
+def _key(instance: str, event: str, message_id: str) -> str:
+    return f"idem:{instance}:{event}:{message_id}"
+
+
+async def claim_event(instance: str, event: str, message_id: str) -> bool:
+    """
+    Claim an event in Redis.
+
+    Returns:
+        False if the event was already claimed (duplicate), True otherwise
+    """
+    redis = get_redis()
+    if redis is None:
+        return True
+
+    try:
+        return bool(await redis.set(_key(instance, event, message_id), "1", nx=True, ex=IDEMPOTENCY_TTL))
+    except Exception as e:
+        log_warning("Idempotency claim failed - falling back to database", instance=instance, error=str(e))
+        return True
+
+
+async def release_event(instance: str, event: str, message_id: str):
+    """Release a claim so a redelivery is processed (call when processing failed early)."""
+    redis = get_redis()
+    if redis is None:
+        return
+
+    try:
+        await redis.delete(_key(instance, event, message_id))
+    except Exception as e:
+        log_warning("Idempotency release failed", instance=instance, error=str(e))
@@ -3,10 +3,19 @@ LLM Client Factory.
 Returns the appropriate LLM provider based on configuration.
 """
 
-from typing import Optional
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from .llm_providers.base import BaseLLMProvider
-from .llm_providers.anthropic_provider import AnthropicProvider
-from .llm_providers.openai_provider import OpenAIProvider
+
+# Reply cache: key -> (expires_at, reply), LRU-ordered
+_REPLY_CACHE: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_REPLY_CACHE_MAX = 5000
+# Generations in flight, shared by concurrent identical requests
+_REPLY_INFLIGHT: Dict[str, asyncio.Task] = {}
 
 
 class UnsupportedProviderError(Exception):
@@ -22,6 +31,9 @@ def get_llm_provider(
     """
     Factory function to get the appropriate LLM provider.
 
+    Providers are cached per (provider, model, kwargs), so repeated calls
+    reuse the same SDK client and its keep-alive connection pool.
+
     Args:
         provider_name: Provider name ("anthropic", "openai").
                       If None, uses LLM_PROVIDER from config.
@@ -45,7 +57,26 @@ def get_llm_provider(
     # Use config default if not specified
     provider = (provider_name or LLM_PROVIDER).lower().strip()
 
+    try:
+        kw_items = tuple(sorted(kwargs.items()))
+        hash(kw_items)
+    except TypeError:
+        # Unhashable kwargs can't be cached - build a fresh instance
+        return _build_provider(provider, model, kwargs)
+
+    return _cached_provider(provider, model, kw_items)
+
+
+@lru_cache(maxsize=16)
+def _cached_provider(provider: str, model: Optional[str], kw_items: tuple) -> BaseLLMProvider:
+    return _build_provider(provider, model, dict(kw_items))
+
+
+def _build_provider(provider: str, model: Optional[str], kwargs: dict) -> BaseLLMProvider:
+    # Provider SDKs are imported on first use so only the configured one loads
     if provider == "anthropic":
+        from .llm_providers.anthropic_provider import AnthropicProvider
+
         provider_kwargs = {}
         if model:
             provider_kwargs["model"] = model
@@ -53,6 +84,8 @@ def get_llm_provider(
         return AnthropicProvider(**provider_kwargs)
 
     elif provider == "openai":
+        from .llm_providers.openai_provider import OpenAIProvider
+
         provider_kwargs = {}
         if model:
             provider_kwargs["model"] = model
@@ -66,6 +99,82 @@ def get_llm_provider(
         )
 
 
+def _reply_cache_key(tenant_id: int, llm_provider: BaseLLMProvider, system_prompt: str, message: str) -> str:
+    normalized = (message or "").strip().lower()
+    raw = f"{tenant_id}|{llm_provider.get_model_name()}|{system_prompt}|{normalized}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _on_reply_done(key: str, ttl: int, task: asyncio.Task):
+    _REPLY_INFLIGHT.pop(key, None)
+    if task.cancelled() or task.exception() is not None or not task.result():
+        return
+    _REPLY_CACHE[key] = (time.monotonic() + ttl, task.result())
+    _REPLY_CACHE.move_to_end(key)
+    while len(_REPLY_CACHE) > _REPLY_CACHE_MAX:
+        _REPLY_CACHE.popitem(last=False)
+
+
+async def generate_cached_reply(
+    llm_provider: BaseLLMProvider,
+    tenant_id: int,
+    message: str,
+    system_prompt: str,
+    context: Optional[List[Dict[str, str]]] = None,
+) -> str:
+    """
+    Generate a reply, reusing a recent one for an identical message.
+
+    Keyed by sha256(tenant_id, model, system_prompt, normalized message) and
+    kept for LLM_REPLY_CACHE_TTL seconds. Concurrent identical requests share
+    a single LLM call.
+
+    The key doesn't cover the conversation, so the cache is bypassed when
+    context is given and for messages shorter than LLM_REPLY_CACHE_MIN_CHARS
+    ("yes", "ok", ...), whose right answer depends on the chat.
+
+    Args:
+        llm_provider: Provider to generate with on a cache miss
+        tenant_id: Tenant the message belongs to
+        message: User message to respond to
+        system_prompt: System prompt defining assistant behavior
+        context: Previous conversation messages (disables caching)
+
+    Returns:
+        Generated (or cached) reply text
+    """
+    from ..config import LLM_REPLY_CACHE_TTL, LLM_REPLY_CACHE_MIN_CHARS
+
+    if (
+        LLM_REPLY_CACHE_TTL <= 0
+        or context
+        or len((message or "").strip()) < LLM_REPLY_CACHE_MIN_CHARS
+    ):
+        return await llm_provider.generate_reply(
+            message=message, system_prompt=system_prompt, context=context
+        )
+
+    key = _reply_cache_key(tenant_id, llm_provider, system_prompt, message)
+
+    cached = _REPLY_CACHE.get(key)
+    if cached is not None:
+        if cached[0] > time.monotonic():
+            _REPLY_CACHE.move_to_end(key)
+            return cached[1]
+        del _REPLY_CACHE[key]
+
+    task = _REPLY_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            llm_provider.generate_reply(message=message, system_prompt=system_prompt)
+        )
+        _REPLY_INFLIGHT[key] = task
+        task.add_done_callback(lambda t: _on_reply_done(key, LLM_REPLY_CACHE_TTL, t))
+
+    # Shield so one cancelled caller doesn't cancel the generation for the others
+    return await asyncio.shield(task)
+
+
 async def generate_ai_reply(
     message: str,
     system_prompt: str,
@@ -1,14 +1,25 @@
 """
 LLM Provider abstraction layer.
 Supports multiple LLM providers (Anthropic, OpenAI, etc.) with a unified interface.
+
+Provider classes are imported lazily so a worker only loads the SDK it uses.
 """
 
-from .base import BaseLLMProvider
-from .anthropic_provider import AnthropicProvider
-from .openai_provider import OpenAIProvider
+from .base import BaseLLMProvider, EmptyResponseError
 
 __all__ = [
     "BaseLLMProvider",
+    "EmptyResponseError",
     "AnthropicProvider",
     "OpenAIProvider",
 ]
+
+
+def __getattr__(name):
+    if name == "AnthropicProvider":
+        from .anthropic_provider import AnthropicProvider
+        return AnthropicProvider
+    if name == "OpenAIProvider":
+        from .openai_provider import OpenAIProvider
+        return OpenAIProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
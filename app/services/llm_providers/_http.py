@@ -0,0 +1,35 @@
+"""
+Shared HTTP client for LLM provider SDKs.
+
+Both AsyncAnthropic and AsyncOpenAI accept an httpx.AsyncClient. Sharing one
+HTTP/2 client lets concurrent generate_reply calls multiplex over a single
+TCP/TLS connection per API host instead of opening one each.
+"""
+
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Return the process-wide LLM HTTP client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        )
+
+    return _client
+
+
+async def close_shared_http_client():
+    """Close the shared client (call on app shutdown)."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
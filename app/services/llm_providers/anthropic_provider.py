@@ -4,9 +4,13 @@ Uses the official Anthropic Python SDK.
 """
 
 import os
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Optional, List, Dict
 from anthropic import AsyncAnthropic, APIError, RateLimitError, APITimeoutError
-from .base import BaseLLMProvider
+from .base import BaseLLMProvider, EmptyResponseError
+from ._http import get_shared_http_client
+
+# Roles Claude accepts in the messages array
+_ALLOWED_ROLES = frozenset(("user", "assistant"))
 
 
 class AnthropicProvider(BaseLLMProvider):
@@ -42,7 +46,37 @@ class AnthropicProvider(BaseLLMProvider):
             api_key=self.api_key,
             timeout=float(self.timeout),
             max_retries=self.max_retries,
+            http_client=get_shared_http_client(),
+        )
+
+    def _build_messages(
+        self,
+        message: str,
+        context: Optional[List[Dict[str, str]]],
+    ) -> List[Dict[str, str]]:
+        """Build the Claude messages array from context plus the current message."""
+        # Build messages array from valid context entries
+        messages = [
+            {"role": role, "content": content}
+            for msg in (context or ())
+            for role, content in ((msg.get("role"), msg.get("content")),)
+            if role in _ALLOWED_ROLES and content is not None
+        ]
+
+        # Claude requires the conversation to start with a user message -
+        # drop any leading assistant messages
+        first_user = next(
+            (i for i, msg in enumerate(messages) if msg["role"] == "user"),
+            len(messages),
         )
+        messages = messages[first_user:]
+
+        # Add current message
+        messages.append({
+            "role": "user",
+            "content": message
+        })
+        return messages
 
     async def generate_reply(
         self,
@@ -65,49 +99,49 @@ class AnthropicProvider(BaseLLMProvider):
         Returns:
             Generated response text
         """
-        from ...config import LLM_MAX_TOKENS
+        # Streamed so the event loop keeps serving other WebSocket events
+        # while tokens arrive
+        parts = [
+            text async for text in self.stream_reply(
+                message, system_prompt, context, max_tokens, temperature
+            )
+        ]
 
-        # Build messages array
-        messages = []
-
-        # Add context if provided
-        if context:
-            # Filter and validate context messages
-            for msg in context:
-                if "role" in msg and "content" in msg:
-                    # Claude expects "user" or "assistant" roles
-                    if msg["role"] in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
+        if not parts:
+            raise EmptyResponseError("Empty response from Claude API")
+        return "".join(parts)
 
-        # Add current message
-        messages.append({
-            "role": "user",
-            "content": message
-        })
+    async def stream_reply(
+        self,
+        message: str,
+        system_prompt: str,
+        context: Optional[List[Dict[str, str]]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a reply from Claude as text fragments.
+
+        Args:
+            Same as generate_reply
+
+        Yields:
+            Text fragments of the response, in order
+        """
+        from ...config import LLM_MAX_TOKENS
 
-        # Ensure messages alternate and start with user
-        if messages and messages[0]["role"] != "user":
-            # Remove leading assistant messages
-            while messages and messages[0]["role"] == "assistant":
-                messages.pop(0)
+        messages = self._build_messages(message, context)
 
         try:
-            response = await self.client.messages.create(
+            async with self.client.messages.stream(
                 model=self.model,
                 max_tokens=max_tokens or LLM_MAX_TOKENS,
                 temperature=temperature,
                 system=system_prompt,
                 messages=messages,
-            )
-
-            # Extract text from response
-            if response.content and len(response.content) > 0:
-                return response.content[0].text
-            else:
-                raise ValueError("Empty response from Claude API")
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
 
         except RateLimitError as e:
             raise Exception(f"Anthropic rate limit exceeded: {str(e)}") from e
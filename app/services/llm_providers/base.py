@@ -4,7 +4,11 @@ All LLM providers must implement this interface.
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import AsyncIterator, Optional, List, Dict, Any
+
+
+class EmptyResponseError(ValueError):
+    """Raised when the LLM returns (or streams) no text at all."""
 
 
 class BaseLLMProvider(ABC):
@@ -34,10 +38,38 @@ class BaseLLMProvider(ABC):
             Generated response text
 
         Raises:
+            EmptyResponseError: If the LLM returns no text
             Exception: If the LLM API call fails
         """
         pass
 
+    async def stream_reply(
+        self,
+        message: str,
+        system_prompt: str,
+        context: Optional[List[Dict[str, str]]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a reply as text fragments while it is generated.
+
+        Providers without native streaming yield the full reply once.
+
+        Args:
+            Same as generate_reply
+
+        Yields:
+            Text fragments of the response, in order
+        """
+        yield await self.generate_reply(
+            message,
+            system_prompt,
+            context=context,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+
     @abstractmethod
     def get_provider_name(self) -> str:
         """
@@ -3,9 +3,13 @@ OpenAI LLM provider implementation.
 Uses the official OpenAI Python SDK.
 """
 
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Optional, List, Dict
 from openai import AsyncOpenAI, APIError, RateLimitError, APITimeoutError
-from .base import BaseLLMProvider
+from .base import BaseLLMProvider, EmptyResponseError
+from ._http import get_shared_http_client
+
+# Roles OpenAI accepts from conversation context
+_ALLOWED_ROLES = frozenset(("user", "assistant", "system"))
 
 
 class OpenAIProvider(BaseLLMProvider):
@@ -41,8 +45,33 @@ class OpenAIProvider(BaseLLMProvider):
             api_key=self.api_key,
             timeout=float(self.timeout),
             max_retries=self.max_retries,
+            http_client=get_shared_http_client(),
         )
 
+    def _build_messages(
+        self,
+        message: str,
+        system_prompt: str,
+        context: Optional[List[Dict[str, str]]],
+    ) -> List[Dict[str, str]]:
+        """Build the OpenAI messages array: system prompt, context, current message."""
+        # Build messages array in one preallocated list:
+        # system prompt, valid context entries, current message
+        ctx = context or ()
+        messages = [None] * (len(ctx) + 2)
+        messages[0] = {"role": "system", "content": system_prompt}
+        n = 1
+        for msg in ctx:
+            role = msg.get("role")
+            content = msg.get("content")
+            if role in _ALLOWED_ROLES and content is not None:
+                messages[n] = {"role": role, "content": content}
+                n += 1
+        messages[n] = {"role": "user", "content": message}
+        # Trim slots left unused by filtered-out context entries
+        del messages[n + 1:]
+        return messages
+
     async def generate_reply(
         self,
         message: str,
@@ -64,47 +93,52 @@ class OpenAIProvider(BaseLLMProvider):
         Returns:
             Generated response text
         """
+        # Streamed so the event loop keeps serving other WebSocket events
+        # while tokens arrive
+        parts = [
+            text async for text in self.stream_reply(
+                message, system_prompt, context, max_tokens, temperature
+            )
+        ]
+
+        # stream_reply yields once per choice chunk, so no parts = no choices
+        if not parts:
+            raise EmptyResponseError("Empty response from OpenAI API")
+        return "".join(parts)
+
+    async def stream_reply(
+        self,
+        message: str,
+        system_prompt: str,
+        context: Optional[List[Dict[str, str]]] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a reply from OpenAI GPT as text fragments.
+
+        Args:
+            Same as generate_reply
+
+        Yields:
+            Text fragments of the response, in order
+        """
         from ...config import LLM_MAX_TOKENS
 
-        # Build messages array
-        messages = []
-
-        # Add system message
-        messages.append({
-            "role": "system",
-            "content": system_prompt
-        })
-
-        # Add context if provided
-        if context:
-            for msg in context:
-                if "role" in msg and "content" in msg:
-                    # OpenAI expects "user", "assistant", or "system" roles
-                    if msg["role"] in ["user", "assistant", "system"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-
-        # Add current message
-        messages.append({
-            "role": "user",
-            "content": message
-        })
+        messages = self._build_messages(message, system_prompt, context)
 
         try:
-            response = await self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 max_tokens=max_tokens or LLM_MAX_TOKENS,
                 temperature=temperature,
                 messages=messages,
+                stream=True,
             )
 
-            # Extract text from response
-            if response.choices and len(response.choices) > 0:
-                return response.choices[0].message.content or ""
-            else:
-                raise ValueError("Empty response from OpenAI API")
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
 
         except RateLimitError as e:
             raise Exception(f"OpenAI rate limit exceeded: {str(e)}") from e
@@ -0,0 +1,86 @@
+"""
+Async PostgREST client for hot paths.
+
+supabase-py is synchronous, so every .execute() blocks the event loop and
+serializes concurrent WebSocket handlers behind database I/O. This module
+talks to Supabase's PostgREST endpoint directly over a shared async
+HTTP/2 connection pool.
+
+Usage:
+    from app.services import pgrest_async as pgrest
+
+    result = await pgrest.rpc("process_inbound_message", {...})
+"""
+
+from typing import Any, Dict, Optional
+
+import httpx
+import orjson
+
+from ..config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class PgRestError(Exception):
+    """Raised when PostgREST returns an error response."""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None):
+        self.status_code = status_code
+        self.code = code  # Postgres SQLSTATE, e.g. "23505" for unique violations
+        super().__init__(message)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared PostgREST client, creating it on first use."""
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": SUPABASE_SERVICE_ROLE_KEY,
+                "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+                "Content-Type": "application/json",
+            },
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(10.0, connect=2.0),
+        )
+
+    return _client
+
+
+async def close():
+    """Close the shared client (call on app shutdown)."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _request(method: str, path: str, body: Any = None) -> Any:
+    content = orjson.dumps(body) if body is not None else None
+
+    response = await _get_client().request(method, path, content=content)
+
+    if response.status_code >= 400:
+        try:
+            error = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            error = {"message": response.text}
+        raise PgRestError(
+            error.get("message") or response.text,
+            status_code=response.status_code,
+            code=error.get("code"),
+        )
+
+    if not response.content:
+        return None
+    return orjson.loads(response.content)
+
+
+async def rpc(function: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    """Call a Postgres function and return its result."""
+    return await _request("POST", f"/rpc/{function}", body=params or {})
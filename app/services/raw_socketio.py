@@ -0,0 +1,207 @@
+"""
+Minimal Socket.IO (Engine.IO v4) client over raw websockets.
+
+Implements the subset of socketio.AsyncClient used by EvolutionWebSocket
+(on/event registration, connect, disconnect, wait, connected) so it can be
+swapped in as the transport. Event frames are matched with a precompiled
+regex and decoded with orjson, skipping the Engine.IO/Socket.IO packet
+layers on the receive hot path.
+
+Only what Evolution API needs is supported: websocket transport, a single
+namespace, server -> client events and ping/pong. No acks, binary packets
+or client -> server emits.
+"""
+
+import asyncio
+import re
+from typing import Any, Callable, Dict, Optional, Set
+from urllib.parse import urlsplit
+
+import orjson
+from websockets.client import connect as ws_connect
+from websockets.exceptions import ConnectionClosed
+
+from ..logger import log_error
+
+# 42["event", {...}] with optional "/namespace," prefix and ack id
+_EIO_EVENT = re.compile(r"^42(?:/[^,]*,)?\d*(\[.*\])$", re.S)
+
+
+class RawSocketIOClient:
+    """Receive-only Socket.IO client on top of `websockets`."""
+
+    def __init__(
+        self,
+        reconnection: bool = True,
+        reconnection_delay: int = 5,
+        reconnection_delay_max: int = 30,
+        **_: Any,
+    ):
+        self.reconnection = reconnection
+        self.reconnection_delay = reconnection_delay
+        self.reconnection_delay_max = reconnection_delay_max
+        self.connected = False
+
+        self._handlers: Dict[str, Callable] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._ws = None
+        self._run_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._url = ""
+        self._headers: Dict[str, str] = {}
+        self._ns_prefix = ""
+
+    def on(self, event: str, handler: Optional[Callable] = None):
+        """Register a handler (usable as a decorator, like socketio)."""
+        def register(fn: Callable) -> Callable:
+            self._handlers[event] = fn
+            return fn
+
+        return register(handler) if handler else register
+
+    def event(self, handler: Callable) -> Callable:
+        """Register a handler named after the function (connect, disconnect, ...)."""
+        self._handlers[handler.__name__] = handler
+        return handler
+
+    async def connect(self, url: str, headers: Optional[Dict[str, str]] = None, **_: Any):
+        """Connect and start the receive loop. Raises if the first attempt fails."""
+        parts = urlsplit(url)
+        scheme = "wss" if parts.scheme in ("https", "wss") else "ws"
+        namespace = parts.path.rstrip("/")
+
+        self._url = f"{scheme}://{parts.netloc}/socket.io/?EIO=4&transport=websocket"
+        self._ns_prefix = f"{namespace}," if namespace else ""
+        self._headers = headers or {}
+        self._closing = False
+
+        await self._open()
+        self._run_task = asyncio.create_task(self._run())
+
+    async def disconnect(self):
+        """Close the connection and stop reconnecting."""
+        self._closing = True
+        if self._run_task is None:
+            return
+
+        if self.connected:
+            try:
+                await self._ws.send(f"41{self._ns_prefix}")
+            except ConnectionClosed:
+                pass
+            await self._ws.close()
+            await self._run_task
+        else:
+            # Between reconnect attempts - nothing to close
+            self._run_task.cancel()
+
+    async def shutdown(self):
+        """Stop the client, aborting any pending reconnection (socketio API parity)."""
+        await self.disconnect()
+
+    async def wait(self):
+        """Wait until the connection is closed for good."""
+        if self._run_task is not None:
+            try:
+                await self._run_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _open(self):
+        """Open the websocket and complete the Engine.IO / namespace handshake."""
+        ws = await ws_connect(
+            self._url,
+            extra_headers=self._headers,
+            compression=None,
+            max_queue=None,
+        )
+
+        opened = await ws.recv()
+        if not opened.startswith("0"):
+            await ws.close()
+            raise ConnectionError(f"Unexpected Engine.IO handshake: {opened[:50]}")
+
+        await ws.send(f"40{self._ns_prefix}")
+        while True:
+            packet = await ws.recv()
+            if packet == "2":
+                await ws.send("3")
+            elif packet.startswith("40"):
+                break
+            elif packet.startswith("44"):
+                await ws.close()
+                error = packet[2 + len(self._ns_prefix):]
+                await self._trigger("connect_error", error)
+                raise ConnectionError(f"Socket.IO connect rejected: {error}")
+
+        self._ws = ws
+        self.connected = True
+        await self._trigger("connect")
+
+    async def _run(self):
+        """Receive until closed, reconnecting with backoff unless disconnect() was called."""
+        delay = self.reconnection_delay
+        while True:
+            await self._receive()
+            self.connected = False
+            await self._trigger("disconnect")
+
+            if self._closing or not self.reconnection:
+                return
+
+            while True:
+                await asyncio.sleep(delay)
+                if self._closing:
+                    return
+                try:
+                    await self._open()
+                    delay = self.reconnection_delay
+                    break
+                except Exception as e:
+                    await self._trigger("connect_error", str(e))
+                    delay = min(delay * 2, self.reconnection_delay_max)
+
+    async def _receive(self):
+        ws = self._ws
+        handlers = self._handlers
+        try:
+            async for packet in ws:
+                if not isinstance(packet, str):
+                    continue
+
+                match = _EIO_EVENT.match(packet)
+                if match is not None:
+                    event, *args = orjson.loads(match.group(1))
+                    handler = handlers.get(event)
+                    if handler is None:
+                        handler = handlers.get("*")
+                        if handler is None:
+                            continue
+                        args = [event, *args]
+                    # Dispatch as a task so slow handlers don't block pings
+                    self._spawn(handler(*args))
+                elif packet == "2":
+                    await ws.send("3")
+                elif packet == "1" or packet.startswith("41"):
+                    return
+        except ConnectionClosed:
+            pass
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            exc = task.exception()
+            log_error(
+                f"Unhandled error in WebSocket event handler: {exc}",
+                error_type=type(exc).__name__,
+            )
+
+    async def _trigger(self, event: str, *args: Any):
+        handler = self._handlers.get(event)
+        if handler is not None:
+            await handler(*args)
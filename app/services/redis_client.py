@@ -0,0 +1,25 @@
+"""
+Shared Redis client.
+
+Redis is optional - every caller must handle get_redis() returning None
+(REDIS_URL unset) and treat Redis errors as a cache miss.
+"""
+
+from ..config import REDIS_URL
+
+_redis = None
+
+
+def get_redis():
+    """Lazily create the shared Redis client (None when REDIS_URL is unset)."""
+    global _redis
+
+    if not REDIS_URL:
+        return None
+
+    if _redis is None:
+        import redis.asyncio as aioredis
+
+        _redis = aioredis.from_url(REDIS_URL)
+
+    return _redis
@@ -0,0 +1,60 @@
+"""
+Classify Supabase/PostgREST errors as transient or permanent.
+
+Shared by the app's background writers and the scripts in scripts/, so
+both retry the same set of errors.
+
+Usage:
+    from app.services.retryable import is_retryable
+
+    if is_retryable(exc):
+        ...  # back off and try again
+"""
+
+import httpx
+
+# postgrest-py raises APIError with the body's "code" when the error body is
+# JSON, so the HTTP status is usually lost - match the codes behind 503/504:
+# PGRST000-002 (database unreachable / schema cache not loaded) and PGRST003
+# (connection pool timeout)
+_RETRYABLE_PGRST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+# SQLSTATE: 08xxx connection exceptions, 53xxx insufficient resources (e.g.
+# too many connections), serialization failures, deadlocks and shutdowns
+_RETRYABLE_SQLSTATE_CLASSES = ("08", "53")
+_RETRYABLE_SQLSTATES = {"40001", "40P01", "57P01", "57P02", "57P03"}
+
+
+def _is_retryable_status(status: int) -> bool:
+    return status == 429 or 500 <= status < 600
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for rate limits, server errors and connection failures."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+
+    # httpx.HTTPStatusError carries the response; PgRestError the status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(exc, "status_code", None)
+
+    code = getattr(exc, "code", None)
+    if isinstance(code, str) and code:
+        if code.isdigit() and len(code) == 3:
+            return _is_retryable_status(int(code))
+        return (
+            code in _RETRYABLE_PGRST_CODES
+            or code in _RETRYABLE_SQLSTATES
+            or code.startswith(_RETRYABLE_SQLSTATE_CLASSES)
+        )
+    if isinstance(code, int):
+        # Non-JSON error bodies: postgrest-py puts the HTTP status here
+        return _is_retryable_status(code)
+
+    if isinstance(status, int):
+        return _is_retryable_status(status)
+
+    # Gateway rate limits come back as a bare {"message": ...} with no code
+    message = str(getattr(exc, "message", "") or exc).lower()
+    return "rate limit" in message or "too many requests" in message
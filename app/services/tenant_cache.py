@@ -0,0 +1,166 @@
+"""
+Two-tier cache for tenant Evolution API configuration.
+
+- L1: in-process TTL dict (per worker, no network)
+- L2: shared Redis (optional - enabled when REDIS_URL is set)
+
+Lookups fall through L1 -> L2 -> Supabase. Both layers are invalidated
+explicitly whenever a tenant is updated or deleted.
+
+The WebSocket path resolves tenants by instance name; those rows are kept
+in a separate in-process map that invalidate_tenant clears as well.
+"""
+
+import time
+from typing import Optional, Dict, Any, Tuple
+
+import orjson
+
+from ..config import TENANT_CACHE_TTL
+from ..logger import log_warning
+from .redis_client import get_redis
+
+# tenant_id -> (expires_at, config)
+_L1: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+# instance_name -> (expires_at, tenant row, or None for an unknown instance)
+_INSTANCES: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+# tenant_id -> instance_name, so invalidate_tenant can reach _INSTANCES
+_INSTANCE_BY_TENANT: Dict[int, str] = {}
+
+INSTANCE_CACHE_TTL = 60.0
+# Kept short so a newly created instance isn't rejected for long by
+# workers that cached it as unknown
+UNKNOWN_INSTANCE_TTL = 5.0
+
+# Atomic get-and-refresh: return the cached value and push its expiry forward
+_GET_AND_REFRESH_LUA = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return value
+"""
+
+_get_and_refresh = None
+
+
+def _key(tenant_id: int) -> str:
+    return f"tenant:{tenant_id}"
+
+
+def _get_redis():
+    """Return the shared Redis client (None when L2 is disabled)."""
+    global _get_and_refresh
+
+    redis = get_redis()
+    if redis is not None and _get_and_refresh is None:
+        _get_and_refresh = redis.register_script(_GET_AND_REFRESH_LUA)
+
+    return redis
+
+
+async def get_tenant_config(tenant_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get cached tenant config from L1, falling back to L2.
+
+    Returns:
+        Tenant config dict, or None on a miss in both layers
+    """
+    entry = _L1.get(tenant_id)
+    if entry is not None:
+        expires_at, config = entry
+        if expires_at > time.monotonic():
+            return config
+        del _L1[tenant_id]
+
+    if _get_redis() is None:
+        return None
+
+    try:
+        raw = await _get_and_refresh(keys=[_key(tenant_id)], args=[TENANT_CACHE_TTL])
+    except Exception as e:
+        log_warning("Tenant cache L2 read failed", tenant_id=tenant_id, error=str(e))
+        return None
+
+    if raw is None:
+        return None
+
+    config = orjson.loads(raw)
+    _L1[tenant_id] = (time.monotonic() + TENANT_CACHE_TTL, config)
+    return config
+
+
+async def set_tenant_config(tenant_id: int, config: Dict[str, Any]):
+    """Store tenant config in both cache layers."""
+    _L1[tenant_id] = (time.monotonic() + TENANT_CACHE_TTL, config)
+
+    redis = _get_redis()
+    if redis is None:
+        return
+
+    try:
+        await redis.set(_key(tenant_id), orjson.dumps(config), ex=TENANT_CACHE_TTL)
+    except Exception as e:
+        log_warning("Tenant cache L2 write failed", tenant_id=tenant_id, error=str(e))
+
+
+def get_instance_tenant(instance: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """
+    Look up a tenant row by instance name (in-process only).
+
+    Returns:
+        (hit, tenant) - tenant is None on a hit for an unknown instance
+    """
+    entry = _INSTANCES.get(instance)
+    if entry is not None:
+        expires_at, tenant = entry
+        if expires_at > time.monotonic():
+            return True, tenant
+        forget_instance(instance)
+    return False, None
+
+
+def set_instance_tenant(instance: str, tenant: Optional[Dict[str, Any]]):
+    """Cache the tenant row for an instance (None marks it unknown)."""
+    if tenant is None:
+        _INSTANCES[instance] = (time.monotonic() + UNKNOWN_INSTANCE_TTL, None)
+        return
+
+    _INSTANCES[instance] = (time.monotonic() + INSTANCE_CACHE_TTL, tenant)
+    _INSTANCE_BY_TENANT[tenant["id"]] = instance
+
+
+def forget_instance(instance: str) -> Optional[Dict[str, Any]]:
+    """
+    Drop an instance from the in-process map.
+
+    Returns:
+        The cached tenant row, if there was one
+    """
+    entry = _INSTANCES.pop(instance, None)
+    if entry is None or entry[1] is None:
+        return None
+
+    tenant = entry[1]
+    if _INSTANCE_BY_TENANT.get(tenant["id"]) == instance:
+        del _INSTANCE_BY_TENANT[tenant["id"]]
+    return tenant
+
+
+async def invalidate_tenant(tenant_id: int):
+    """Drop a tenant from both cache layers (call after tenant updates/deletes)."""
+    _L1.pop(tenant_id, None)
+
+    instance = _INSTANCE_BY_TENANT.pop(tenant_id, None)
+    if instance is not None:
+        _INSTANCES.pop(instance, None)
+
+    redis = _get_redis()
+    if redis is None:
+        return
+
+    try:
+        await redis.delete(_key(tenant_id))
+    except Exception as e:
+        log_warning("Tenant cache L2 invalidation failed", tenant_id=tenant_id, error=str(e))
@@ -8,25 +8,50 @@ and processes them using the same logic as the webhook handler.
 import asyncio
 import time
 import random
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Dict, Any, List, Set
 
-from ..db import supabase
+from . import pgrest_async as pgrest
+from .idempotency import claim_event, release_event
+from .retryable import is_retryable
+from .tenant_cache import get_instance_tenant, set_instance_tenant, forget_instance
 from ..evolve_parse import (
     extract_chat_id, extract_message_id, extract_from_me,
     extract_text, extract_message_type
 )
-from ..services.collision import should_pause_on_event, now_utc
-from ..services.llm_client import get_llm_provider
-from ..services.evolution_client import EvolutionClient, EvolutionAPIError
+from ..services.collision import should_pause_on_event
+from ..services.llm_client import get_llm_provider, generate_cached_reply
+from ..services.llm_providers import EmptyResponseError
+from ..services.evolution_client import (
+    EvolutionClient, EvolutionAPIError, get_tenant_client, drop_tenant_client
+)
 from ..config import (
     DEFAULT_SYSTEM_PROMPT, LLM_PROVIDER,
     MESSAGE_DELAY_ENABLED, MESSAGE_DELAY_MIN_MS, MESSAGE_DELAY_MAX_MS,
-    TYPING_INDICATOR_ENABLED
+    TYPING_INDICATOR_ENABLED, STREAM_REPLY_CHUNKS
 )
 from ..logger import log_info, log_warning, log_error
 
+if TYPE_CHECKING:
+    from .evolution_websocket import EvolutionWebSocket
+
+# Streamed replies are flushed at sentence ends or this many characters
+_STREAM_CHUNK_MAX_CHARS = 160
+_SENTENCE_ENDINGS = (".", "!", "?")
+
+# Final event results are queued and written in batches
+_FINALIZE_QUEUE_MAX = 10000
+_FLUSH_BATCH_SIZE = 100
+_FLUSH_INTERVAL = 0.05
+_FLUSH_MAX_ATTEMPTS = 5
+_finalize_queue: Optional[asyncio.Queue] = None
+_flush_task: Optional[asyncio.Task] = None
+
+# Delayed replies waiting to be sent; held here so they aren't garbage
+# collected mid-sleep and can be drained on shutdown
+_SCHEDULED_SENDS: Set[asyncio.Task] = set()
 
-async def handle_websocket_message(data: Dict[str, Any]):
+
+async def handle_websocket_message(data: Dict[str, Any], _ws: Optional["EvolutionWebSocket"] = None):
     """
     Handle incoming message from WebSocket.
 
@@ -34,6 +59,7 @@ async def handle_websocket_message(data: Dict[str, Any]):
 
     Args:
         data: The event data from Evolution API WebSocket
+        _ws: Owning connection, pre-bound by the manager for instance-mode connections
     """
     start_time = time.time()
 
@@ -41,6 +67,8 @@ async def handle_websocket_message(data: Dict[str, Any]):
     # Extract the event type and instance
     event = data.get("event", "messages.upsert")
     instance = data.get("instance")
+    if not instance and _ws is not None:
+        instance = _ws.instance_name
 
     # If data is nested, extract it
     if "data" in data:
@@ -60,33 +88,6 @@ async def handle_websocket_message(data: Dict[str, Any]):
         log_warning("WebSocket message missing instance", action="ws_missing_instance")
         return {"ok": False, "error": "Missing instance"}
 
-    # 1) Resolve tenant by instance_name
-    try:
-        tenant_resp = (
-            supabase.table("tenants")
-            .select("id, instance_name, evo_server_url, system_prompt, llm_provider")
-            .eq("instance_name", instance)
-            .limit(1)
-            .execute()
-        )
-    except Exception as e:
-        log_error(
-            "Database error resolving tenant",
-            instance=instance,
-            error=str(e),
-            action="ws_tenant_error",
-        )
-        return {"ok": False, "error": f"Database error: {e}"}
-
-    if not tenant_resp.data:
-        log_warning("Unknown instance from WebSocket", instance=instance, action="ws_unknown_instance")
-        return {"ok": False, "error": f"Unknown instance: {instance}"}
-
-    tenant = tenant_resp.data[0]
-    tenant_id = tenant["id"]
-
-    log_info("Tenant resolved via WebSocket", tenant_id=tenant_id, instance=instance, action="ws_tenant_resolved")
-
     # Only handle message events
     if event not in ("messages.upsert", "message"):
         log_info(f"Ignoring event type: {event}", action="ws_event_ignored")
@@ -105,121 +106,128 @@ async def handle_websocket_message(data: Dict[str, Any]):
     # For replies, use chat_id (remoteJid) which is the customer
     reply_to = chat_id
 
-    # 2) Idempotency check
-    try:
-        existing = supabase.table("processed_events").select("*").eq(
-            "tenant_id", tenant_id
-        ).eq("message_id", msg_id).eq("event_type", event).execute()
+    # Check for collision (human intervention)
+    pause = should_pause_on_event(event, from_me)
 
-        if existing.data and len(existing.data) > 0:
-            log_info(
-                "Duplicate message ignored - already processed",
-                tenant_id=tenant_id,
-                chat_id=chat_id,
-                message_id=msg_id,
-                action="ws_duplicate_ignored",
-            )
-            return {"ok": True, "action": "duplicate_ignored", "message_id": msg_id}
-    except Exception as e:
-        log_warning(
-            "Idempotency check skipped",
-            error=str(e),
-            action="ws_idempotency_skipped",
+    # Cached tenant lets the RPC skip its lookup; unknown instances are
+    # rejected without touching the database
+    cached, tenant = get_instance_tenant(instance)
+    if cached and tenant is None:
+        log_warning("Unknown instance from WebSocket", instance=instance, action="ws_unknown_instance")
+        return {"ok": False, "error": f"Unknown instance: {instance}"}
+
+    # Redis fast path: drop redeliveries before any database work
+    if not await claim_event(instance, event, msg_id):
+        log_info(
+            "Duplicate message ignored - already claimed",
+            instance=instance,
+            chat_id=chat_id,
+            message_id=msg_id,
+            action="ws_duplicate_ignored",
         )
+        return {"ok": True, "action": "duplicate_ignored", "message_id": msg_id}
 
-    # 3) Store inbound message
+    # 1) Resolve tenant, claim the event, store the message and upsert the
+    # session in a single round-trip (see database/migrations/003)
     try:
-        supabase.table("messages").insert({
-            "tenant_id": tenant_id,
-            "chat_id": chat_id,
-            "message_id": msg_id,
-            "from_me": from_me,
-            "message_type": msg_type or "conversation",
-            "text": text,
-            "raw": payload,
-        }).execute()
+        result = await pgrest.rpc("process_inbound_message", {
+            "p_instance": instance,
+            "p_message_id": msg_id,
+            "p_event": event,
+            "p_chat_id": chat_id,
+            "p_from_me": from_me,
+            "p_text": text,
+            "p_msg_type": msg_type,
+            "p_raw": payload,
+            "p_pause": pause,
+            "p_tenant_id": tenant["id"] if tenant else None,
+        })
     except Exception as e:
-        if "duplicate key" not in str(e).lower():
-            log_warning(
-                "Failed to store message",
-                tenant_id=tenant_id,
-                message_id=msg_id,
-                error=str(e),
-                action="ws_store_message_failed",
-            )
+        log_error(
+            "Database error processing inbound message",
+            instance=instance,
+            message_id=msg_id,
+            error=str(e),
+            action="ws_inbound_rpc_error",
+        )
+        # Nothing was stored - let a redelivery through
+        await release_event(instance, event, msg_id)
+        return {"ok": False, "error": f"Database error: {e}"}
 
-    # 4) Upsert session
-    now = now_utc()
-    session_data = {
-        "tenant_id": tenant_id,
-        "chat_id": chat_id,
-        "last_message_at": now.isoformat(),
-    }
+    status = result["status"]
+    if status == "unknown_instance":
+        await release_event(instance, event, msg_id)
+        set_instance_tenant(instance, None)
+        log_warning("Unknown instance from WebSocket", instance=instance, action="ws_unknown_instance")
+        return {"ok": False, "error": f"Unknown instance: {instance}"}
+
+    if tenant is None:
+        tenant = result["tenant"]
+        set_instance_tenant(instance, tenant)
+        log_info("Tenant resolved via WebSocket", tenant_id=tenant["id"], instance=instance, action="ws_tenant_resolved")
 
-    # 5) Check for collision (human intervention)
-    if should_pause_on_event(event, from_me):
-        session_data["is_paused"] = True
-        session_data["pause_reason"] = "human_intervention"
-        session_data["last_human_at"] = now.isoformat()
+    tenant_id = tenant["id"]
 
+    if status == "duplicate":
+        log_info(
+            "Duplicate message ignored - already processed",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            message_id=msg_id,
+            action="ws_duplicate_ignored",
+        )
+        return {"ok": True, "action": "duplicate_ignored", "message_id": msg_id}
+
+    if status == "paused":
         log_info(
             "Session paused due to human intervention (WebSocket)",
             tenant_id=tenant_id,
             chat_id=chat_id,
             action="ws_session_paused",
         )
-
-        # Record event and return
-        _record_processed_event(tenant_id, msg_id, event, "paused")
-
-        try:
-            supabase.table("sessions").upsert(
-                session_data,
-                on_conflict="tenant_id,chat_id"
-            ).execute()
-        except Exception as e:
-            log_error("Failed to upsert session", error=str(e))
-
         return {"ok": True, "action": "paused", "chat_id": chat_id}
 
-    # Upsert session (not paused)
-    try:
-        supabase.table("sessions").upsert(
-            session_data,
-            on_conflict="tenant_id,chat_id"
-        ).execute()
-    except Exception as e:
-        log_warning("Failed to upsert session", error=str(e))
+    if status == "ignored_paused":
+        log_info(
+            "Session is paused, skipping AI reply (WebSocket)",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            action="ws_ignored_paused",
+        )
+        return {"ok": True, "action": "ignored_paused", "chat_id": chat_id}
 
-    # 6) Check if session is paused
-    try:
-        session_resp = supabase.table("sessions").select("is_paused").eq(
-            "tenant_id", tenant_id
-        ).eq("chat_id", chat_id).limit(1).execute()
+    if status == "stored":
+        return {"ok": True}
 
-        if session_resp.data and session_resp.data[0].get("is_paused"):
-            log_info(
-                "Session is paused, skipping AI reply (WebSocket)",
-                tenant_id=tenant_id,
-                chat_id=chat_id,
-                action="ws_ignored_paused",
-            )
-            _record_processed_event(tenant_id, msg_id, event, "ignored_paused")
-            return {"ok": True, "action": "ignored_paused", "chat_id": chat_id}
-    except Exception as e:
-        log_warning("Failed to check session pause status", error=str(e))
+    # Only conversation / extendedTextMessage carry text (see extract_text);
+    # imageMessage and videoMessage without a caption, audioMessage,
+    # stickerMessage, reactionMessage, documentMessage, locationMessage,
+    # contactMessage and protocolMessage arrive empty. Human-sent ones have
+    # already paused the session above, so there is nothing left to do.
+    if from_me is False and not (text or "").strip():
+        log_info(
+            "No text in message, skipping AI reply (WebSocket)",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            message_id=msg_id,
+            action="ws_skipped_no_text",
+            extra_data={"msg_type": msg_type},
+        )
+        _finalize_event(tenant_id, msg_id, event, "skipped_no_text")
+        return {"ok": True, "action": "skipped_no_text", "chat_id": chat_id}
 
-    # 7) Generate AI reply for inbound messages
+    # 2) Generate AI reply for inbound messages
     if from_me is False:
         try:
-            evolution_client = EvolutionClient()
+            evolution_client = get_tenant_client(tenant_id)
 
             # Skip mark_as_read and typing for @lid contacts (Evolution API doesn't support them)
             is_lid_contact = chat_id.endswith("@lid")
+            show_typing = TYPING_INDICATOR_ENABLED and not is_lid_contact
+            system_prompt = tenant.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
+            provider_name = tenant.get("llm_provider") or LLM_PROVIDER
 
-            # Mark message as read before processing (show blue checkmarks)
-            # Skip for @lid contacts as Evolution API can't validate them
-            if not is_lid_contact:
+            async def mark_read():
                 try:
                     await evolution_client.mark_as_read(
                         tenant_id=tenant_id,
@@ -243,9 +251,7 @@ async def handle_websocket_message(data: Dict[str, Any]):
                         action="ws_mark_read_failed",
                     )
 
-            # Send typing indicator (composing) before generating reply
-            # Skip for @lid contacts as Evolution API can't validate them
-            if TYPING_INDICATOR_ENABLED and not is_lid_contact:
+            async def start_typing():
                 try:
                     await evolution_client.send_presence(
                         tenant_id=tenant_id,
@@ -268,8 +274,14 @@ async def handle_websocket_message(data: Dict[str, Any]):
                         action="ws_typing_failed",
                     )
 
-            system_prompt = tenant.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
-            provider_name = tenant.get("llm_provider") or LLM_PROVIDER
+            # Mark message as read (blue checkmarks) and show typing while the
+            # reply is generated - both run concurrently with the LLM call.
+            # Skip for @lid contacts as Evolution API can't validate them
+            pre_tasks = []
+            if not is_lid_contact:
+                pre_tasks.append(mark_read())
+            if show_typing:
+                pre_tasks.append(start_typing())
 
             log_info(
                 "Generating AI reply (WebSocket)",
@@ -279,100 +291,62 @@ async def handle_websocket_message(data: Dict[str, Any]):
                 action="ws_ai_generate_start",
             )
 
-            # Generate AI reply
             llm_provider = get_llm_provider(provider_name)
-            reply_text = await llm_provider.generate_reply(
-                message=text,
-                system_prompt=system_prompt,
-            )
-
-            log_info(
-                "AI reply generated (WebSocket)",
-                tenant_id=tenant_id,
-                chat_id=chat_id,
-                reply_length=len(reply_text),
-                action="ws_ai_generate_success",
-            )
 
-            # Add human-like delay before sending (to avoid WhatsApp bans)
-            if MESSAGE_DELAY_ENABLED:
-                delay_ms = random.randint(MESSAGE_DELAY_MIN_MS, MESSAGE_DELAY_MAX_MS)
-                delay_seconds = delay_ms / 1000.0
-
-                # Refresh typing indicator during delay (skip for @lid contacts)
-                if TYPING_INDICATOR_ENABLED and not is_lid_contact:
-                    try:
-                        await evolution_client.send_presence(
-                            tenant_id=tenant_id,
-                            chat_id=chat_id,
-                            presence="composing",
-                            delay=delay_ms
-                        )
-                    except Exception:
-                        pass  # Non-critical
+            if STREAM_REPLY_CHUNKS:
+                # Send sentence-sized chunks as the LLM streams them; pre-tasks
+                # run alongside and log their own failures
+                pre = asyncio.gather(*pre_tasks)
+                try:
+                    reply_text = await _send_streamed_reply(
+                        evolution_client, llm_provider, tenant_id, reply_to, msg_id,
+                        text, system_prompt, is_lid_contact,
+                    )
+                finally:
+                    await pre
+            else:
+                # Generate AI reply (pre-tasks log their own failures)
+                reply_text, *_ = await asyncio.gather(
+                    generate_cached_reply(llm_provider, tenant_id, text, system_prompt),
+                    *pre_tasks,
+                )
 
                 log_info(
-                    "Adding human-like delay before sending (WebSocket)",
+                    "AI reply generated (WebSocket)",
                     tenant_id=tenant_id,
                     chat_id=chat_id,
-                    delay_ms=delay_ms,
-                    action="ws_delay_start",
+                    reply_length=len(reply_text),
+                    action="ws_ai_generate_success",
                 )
-                await asyncio.sleep(delay_seconds)
 
-            # Send reply via Evolution API
-            # For @lid contacts, use quoted message to reply (helps bypass number validation)
-            await evolution_client.send_text_message(
-                tenant_id=tenant_id,
-                chat_id=reply_to,
-                text=reply_text,
-                quoted_message_id=msg_id if is_lid_contact else None
-            )
-
-            # Stop typing indicator after sending (skip for @lid contacts)
-            if TYPING_INDICATOR_ENABLED and not is_lid_contact:
-                try:
-                    await evolution_client.send_presence(
-                        tenant_id=tenant_id,
-                        chat_id=chat_id,
-                        presence="paused"
-                    )
-                except Exception:
-                    pass  # Non-critical
-
-            log_info(
-                "Reply sent via Evolution API (WebSocket)",
-                tenant_id=tenant_id,
-                chat_id=chat_id,
-                action="ws_evolution_send_success",
-            )
-
-            # Store outbound message
-            try:
-                supabase.table("messages").insert({
-                    "tenant_id": tenant_id,
-                    "chat_id": chat_id,
-                    "message_id": f"out-{msg_id}",
-                    "from_me": True,
-                    "message_type": "conversation",
-                    "text": reply_text,
-                    "raw": {"generated": True, "model": llm_provider.get_model_name(), "source": "websocket"}
-                }).execute()
-            except Exception as e:
-                log_warning("Failed to store outbound message", error=str(e))
-
-            total_duration = int((time.time() - start_time) * 1000)
+                # Add human-like delay before sending (to avoid WhatsApp bans).
+                # The wait runs in a background task so this handler returns
+                # immediately instead of holding the event for seconds.
+                if MESSAGE_DELAY_ENABLED:
+                    delay_ms = random.randint(MESSAGE_DELAY_MIN_MS, MESSAGE_DELAY_MAX_MS)
+                    task = asyncio.create_task(_delayed_send(
+                        evolution_client, llm_provider, tenant_id, chat_id, reply_to,
+                        msg_id, event, reply_text, delay_ms, is_lid_contact,
+                        show_typing, start_time,
+                    ))
+                    _SCHEDULED_SENDS.add(task)
+                    task.add_done_callback(_SCHEDULED_SENDS.discard)
+                    return {"ok": True, "action": "ai_scheduled", "chat_id": chat_id}
+
+                # Send reply via Evolution API
+                # For @lid contacts, use quoted message to reply (helps bypass number validation)
+                await evolution_client.send_text_message(
+                    tenant_id=tenant_id,
+                    chat_id=reply_to,
+                    text=reply_text,
+                    quoted_message_id=msg_id if is_lid_contact else None
+                )
 
-            log_info(
-                "AI reply pipeline completed (WebSocket)",
-                tenant_id=tenant_id,
-                chat_id=chat_id,
-                duration_ms=total_duration,
-                action="ws_ai_replied",
+            await _complete_reply(
+                evolution_client, llm_provider, tenant_id, chat_id, msg_id,
+                event, reply_text, show_typing, start_time,
             )
 
-            _record_processed_event(tenant_id, msg_id, event, "ai_replied")
-
             return {
                 "ok": True,
                 "action": "ai_replied",
@@ -388,7 +362,7 @@ async def handle_websocket_message(data: Dict[str, Any]):
                 error=str(e),
                 action="ws_evolution_send_failed",
             )
-            _record_processed_event(tenant_id, msg_id, event, "evolution_send_failed")
+            _finalize_event(tenant_id, msg_id, event, "evolution_send_failed")
             return {"ok": True, "action": "evolution_send_failed", "error": str(e)}
 
         except Exception as e:
@@ -399,7 +373,7 @@ async def handle_websocket_message(data: Dict[str, Any]):
                 error=str(e),
                 action="ws_ai_failed",
             )
-            _record_processed_event(tenant_id, msg_id, event, "ai_failed")
+            _finalize_event(tenant_id, msg_id, event, "ai_failed")
             return {"ok": True, "action": "ai_failed", "error": str(e)}
 
     return {"ok": True}
@@ -417,22 +391,371 @@ async def handle_websocket_connection_update(data: Dict[str, Any]):
         action="ws_connection_update",
     )
 
+    # Connection changes are rare - drop the cached tenant so the next
+    # message re-resolves it (covers disconnects and newly created instances)
+    if instance:
+        tenant = forget_instance(instance)
+        if tenant is not None and state == "close":
+            drop_tenant_client(tenant["id"])
+
     return {"ok": True, "instance": instance, "state": state}
 
 
-def _record_processed_event(tenant_id: int, message_id: str, event_type: str, action_taken: str):
-    """Record a processed event for idempotency."""
+async def _complete_reply(
+    evolution_client: EvolutionClient,
+    llm_provider,
+    tenant_id: int,
+    chat_id: str,
+    msg_id: str,
+    event: str,
+    reply_text: str,
+    show_typing: bool,
+    start_time: float,
+):
+    """Stop the typing indicator and record a sent reply."""
+    # Stop typing indicator after sending (skip for @lid contacts)
+    if show_typing:
+        try:
+            await evolution_client.send_presence(
+                tenant_id=tenant_id,
+                chat_id=chat_id,
+                presence="paused"
+            )
+        except Exception:
+            pass  # Non-critical
+
+    log_info(
+        "Reply sent via Evolution API (WebSocket)",
+        tenant_id=tenant_id,
+        chat_id=chat_id,
+        action="ws_evolution_send_success",
+    )
+
+    # Store outbound message and mark the event replied in one call
+    _finalize_event(
+        tenant_id, msg_id, event, "ai_replied",
+        chat_id=chat_id,
+        reply_text=reply_text,
+        raw={"generated": True, "model": llm_provider.get_model_name(), "source": "websocket"},
+    )
+
+    total_duration = int((time.time() - start_time) * 1000)
+
+    log_info(
+        "AI reply pipeline completed (WebSocket)",
+        tenant_id=tenant_id,
+        chat_id=chat_id,
+        duration_ms=total_duration,
+        action="ws_ai_replied",
+    )
+
+
+async def _delayed_send(
+    evolution_client: EvolutionClient,
+    llm_provider,
+    tenant_id: int,
+    chat_id: str,
+    reply_to: str,
+    msg_id: str,
+    event: str,
+    reply_text: str,
+    delay_ms: int,
+    is_lid_contact: bool,
+    show_typing: bool,
+    start_time: float,
+):
+    """Wait out the human-like delay, then send the reply and record it."""
+    try:
+        # Refresh typing indicator during delay (skip for @lid contacts)
+        if show_typing:
+            try:
+                await evolution_client.send_presence(
+                    tenant_id=tenant_id,
+                    chat_id=chat_id,
+                    presence="composing",
+                    delay=delay_ms
+                )
+            except Exception:
+                pass  # Non-critical
+
+        log_info(
+            "Adding human-like delay before sending (WebSocket)",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            delay_ms=delay_ms,
+            action="ws_delay_start",
+        )
+        await asyncio.sleep(delay_ms / 1000.0)
+
+        # For @lid contacts, use quoted message to reply (helps bypass number validation)
+        await evolution_client.send_text_message(
+            tenant_id=tenant_id,
+            chat_id=reply_to,
+            text=reply_text,
+            quoted_message_id=msg_id if is_lid_contact else None
+        )
+
+        await _complete_reply(
+            evolution_client, llm_provider, tenant_id, chat_id, msg_id,
+            event, reply_text, show_typing, start_time,
+        )
+
+    except EvolutionAPIError as e:
+        log_error(
+            "Evolution API send failed (WebSocket)",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            error=str(e),
+            action="ws_evolution_send_failed",
+        )
+        _finalize_event(tenant_id, msg_id, event, "evolution_send_failed")
+
+    except Exception as e:
+        log_error(
+            "Delayed reply send failed (WebSocket)",
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            error=str(e),
+            action="ws_ai_failed",
+        )
+        _finalize_event(tenant_id, msg_id, event, "ai_failed")
+
+
+async def drain_scheduled_sends(timeout: float):
+    """
+    Wait for delayed replies still sleeping in the background (call on shutdown).
+
+    Sends that don't finish within the timeout are cancelled; their events
+    stay 'in_flight' and are not retried.
+    """
+    if not _SCHEDULED_SENDS:
+        return
+
+    log_info(
+        "Waiting for scheduled replies",
+        action="ws_scheduled_drain",
+        extra_data={"pending": len(_SCHEDULED_SENDS)},
+    )
+    _, pending = await asyncio.wait(set(_SCHEDULED_SENDS), timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+
+async def _sentence_chunks(fragments: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regroup streamed text fragments into sentence-sized chunks."""
+    buf: List[str] = []
+    size = 0
+    async for fragment in fragments:
+        if not fragment:
+            continue
+
+        # A terminator only ends a sentence once whitespace (or the end of
+        # the stream) follows it, so token splits like "$3." + "50" stay in
+        # one message
+        if buf:
+            tail = buf[-1]
+            if tail.rstrip().endswith(_SENTENCE_ENDINGS) and (tail[-1].isspace() or fragment[0].isspace()):
+                chunk = "".join(buf).strip()
+                buf.clear()
+                size = 0
+                if chunk:
+                    yield chunk
+
+        buf.append(fragment)
+        size += len(fragment)
+        if size >= _STREAM_CHUNK_MAX_CHARS:
+            chunk = "".join(buf).strip()
+            buf.clear()
+            size = 0
+            if chunk:
+                yield chunk
+
+    chunk = "".join(buf).strip()
+    if chunk:
+        yield chunk
+
+
+async def _send_streamed_reply(
+    evolution_client: EvolutionClient,
+    llm_provider,
+    tenant_id: int,
+    chat_id: str,
+    msg_id: str,
+    text: str,
+    system_prompt: str,
+    is_lid_contact: bool,
+) -> str:
+    """
+    Send an AI reply as sentence-sized messages while the LLM generates it.
+
+    Returns:
+        The full reply text (chunks joined)
+    """
+    sent: List[str] = []
+    show_typing = TYPING_INDICATOR_ENABLED and not is_lid_contact
+    fragments = llm_provider.stream_reply(message=text, system_prompt=system_prompt)
+
+    async for chunk in _sentence_chunks(fragments):
+        # Human-like delay before the first message (to avoid WhatsApp bans);
+        # tokens keep arriving in the background meanwhile
+        if not sent and MESSAGE_DELAY_ENABLED:
+            await asyncio.sleep(random.randint(MESSAGE_DELAY_MIN_MS, MESSAGE_DELAY_MAX_MS) / 1000.0)
+
+        # For @lid contacts, quote the inbound message on the first chunk
+        await evolution_client.send_text_message(
+            tenant_id=tenant_id,
+            chat_id=chat_id,
+            text=chunk,
+            quoted_message_id=msg_id if is_lid_contact and not sent else None
+        )
+        sent.append(chunk)
+
+        # Keep "typing..." visible while the next chunk is generated
+        if show_typing:
+            try:
+                await evolution_client.send_presence(
+                    tenant_id=tenant_id,
+                    chat_id=chat_id,
+                    presence="composing",
+                    delay=3000
+                )
+            except Exception:
+                pass  # Non-critical
+
+    if not sent:
+        raise EmptyResponseError("Empty response from LLM")
+
+    log_info(
+        "AI reply streamed (WebSocket)",
+        tenant_id=tenant_id,
+        chat_id=chat_id,
+        action="ws_ai_stream_success",
+        extra_data={"chunks": len(sent)},
+    )
+    return " ".join(sent)
+
+
+def _finalize_event(
+    tenant_id: int,
+    message_id: str,
+    event_type: str,
+    action_taken: str,
+    chat_id: Optional[str] = None,
+    reply_text: Optional[str] = None,
+    raw: Optional[Dict[str, Any]] = None,
+):
+    """
+    Queue the final action for an event (plus the outbound reply, if one was sent).
+
+    Rows are written in batches by a background worker - see _flush_worker.
+    """
+    global _finalize_queue, _flush_task
+
+    if _finalize_queue is None:
+        _finalize_queue = asyncio.Queue(maxsize=_FINALIZE_QUEUE_MAX)
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_worker())
+
     try:
-        supabase.table("processed_events").insert({
+        _finalize_queue.put_nowait({
             "tenant_id": tenant_id,
             "message_id": message_id,
             "event_type": event_type,
             "action_taken": action_taken,
-        }).execute()
-    except Exception as e:
+            "chat_id": chat_id,
+            "reply_text": reply_text,
+            "raw": raw,
+        })
+    except asyncio.QueueFull:
         log_warning(
-            "Failed to record processed event",
+            "Failed to record processed event - queue full",
             tenant_id=tenant_id,
             message_id=message_id,
-            error=str(e),
         )
+
+
+async def _write_batch(batch: List[Dict[str, Any]]):
+    """Write one batch with the finalize_events RPC."""
+    await pgrest.rpc("finalize_events", {"p_events": batch})
+
+
+async def _write_batch_with_retry(batch: List[Dict[str, Any]]) -> bool:
+    """
+    Write one batch, retrying transient errors up to _FLUSH_MAX_ATTEMPTS times.
+
+    Permanent errors (missing RPC, bad payload, FK violations) and batches
+    that run out of attempts are dropped so they don't block newer rows.
+
+    Returns:
+        True if the batch was written
+    """
+    for attempt in range(1, _FLUSH_MAX_ATTEMPTS + 1):
+        try:
+            await _write_batch(batch)
+            return True
+        except Exception as e:
+            if attempt == _FLUSH_MAX_ATTEMPTS or not is_retryable(e):
+                log_error(
+                    "Dropped processed events - write failed",
+                    error=str(e),
+                    extra_data={
+                        "batch_size": len(batch),
+                        "attempts": attempt,
+                        "message_ids": [row["message_id"] for row in batch],
+                    },
+                )
+                return False
+
+            log_warning(
+                "Failed to record processed events - will retry",
+                error=str(e),
+                extra_data={"batch_size": len(batch), "attempt": attempt},
+            )
+            await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0))
+
+    return False
+
+
+async def _flush_worker():
+    """Drain the finalize queue, flushing every _FLUSH_BATCH_SIZE rows or _FLUSH_INTERVAL seconds."""
+    queue = _finalize_queue
+    loop = asyncio.get_running_loop()
+
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + _FLUSH_INTERVAL
+        while len(batch) < _FLUSH_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        await _write_batch_with_retry(batch)
+
+
+async def flush_pending_events():
+    """Stop the flush worker and write whatever is still queued (call on shutdown)."""
+    global _flush_task
+
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
+
+    if _finalize_queue is None:
+        return
+
+    batch = []
+    while not _finalize_queue.empty():
+        batch.append(_finalize_queue.get_nowait())
+    if batch:
+        try:
+            await _write_batch(batch)
+        except Exception as e:
+            log_error(
+                "Failed to flush processed events on shutdown",
+                error=str(e),
+                extra_data={"batch_size": len(batch)},
+            )
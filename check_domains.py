@@ -3,18 +3,24 @@
 Bulk domain availability checker via Porkbun API v3.
 
 Setup:
-    pip install aiohttp
+    pip install aiohttp orjson
 
 Usage:
     python check_domains.py
 
+Results are cached for an hour in ~/.cache/porkbun_check.json; delete it
+to force a full recheck.
+
 Get API keys at: https://porkbun.com/account/api
 """
 
 import asyncio
-import json
 import sys
+import time
+from pathlib import Path
+
 import aiohttp
+import orjson
 
 # ── Configure these ──────────────────────────────────────────────────────────
 
@@ -50,6 +56,11 @@ TLDS = [".com", ".io", ".co", ".ai", ".app"]
 API_BASE    = "https://api.porkbun.com/api/json/v3/domain/checkDomain"
 CONCURRENCY = 8   # max parallel requests (be polite to the API)
 
+# Successful results are cached on disk so reruns while tweaking the lists
+# above only query new or stale domains
+CACHE_PATH  = Path.home() / ".cache" / "porkbun_check.json"
+CACHE_TTL   = 3600  # seconds
+
 # ANSI colours
 GREEN  = "\033[92m"
 RED    = "\033[91m"
@@ -63,59 +74,96 @@ RESET  = "\033[0m"
 async def check_domain(
     session: aiohttp.ClientSession,
     domain: str,
-    semaphore: asyncio.Semaphore,
 ) -> dict:
-    async with semaphore:
-        url     = f"{API_BASE}/{domain}"
-        payload = {"apikey": PORKBUN_API_KEY, "secretapikey": PORKBUN_SECRET_KEY}
-        try:
-            async with session.post(
-                url,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=12),
-            ) as resp:
-                data = await resp.json(content_type=None)
-
-                if data.get("status") != "SUCCESS":
-                    return {
-                        "domain":    domain,
-                        "available": False,
-                        "price":     None,
-                        "regular":   None,
-                        "premium":   False,
-                        "error":     data.get("message", "Unknown error"),
-                    }
-
-                r = data.get("response", {})
+    # In-flight requests are capped by the session's connector
+    url     = f"{API_BASE}/{domain}"
+    payload = {"apikey": PORKBUN_API_KEY, "secretapikey": PORKBUN_SECRET_KEY}
+    try:
+        async with session.post(url, json=payload) as resp:
+            data = await resp.json(content_type=None, loads=orjson.loads)
+
+            if data.get("status") != "SUCCESS":
                 return {
                     "domain":    domain,
-                    "available": r.get("avail", "no") == "yes",
-                    "price":     r.get("price"),
-                    "regular":   r.get("regularPrice"),
-                    "premium":   r.get("premium", "no") == "yes",
-                    "error":     None,
+                    "available": False,
+                    "price":     None,
+                    "regular":   None,
+                    "premium":   False,
+                    "error":     data.get("message", "Unknown error"),
                 }
 
-        except asyncio.TimeoutError:
-            return {"domain": domain, "available": None, "price": None,
-                    "regular": None, "premium": False, "error": "Timeout"}
-        except Exception as exc:
-            return {"domain": domain, "available": None, "price": None,
-                    "regular": None, "premium": False, "error": str(exc)}
+            r = data.get("response", {})
+            return {
+                "domain":    domain,
+                "available": r.get("avail", "no") == "yes",
+                "price":     r.get("price"),
+                "regular":   r.get("regularPrice"),
+                "premium":   r.get("premium", "no") == "yes",
+                "error":     None,
+            }
 
+    except asyncio.TimeoutError:
+        return {"domain": domain, "available": None, "price": None,
+                "regular": None, "premium": False, "error": "Timeout"}
+    except Exception as exc:
+        return {"domain": domain, "available": None, "price": None,
+                "regular": None, "premium": False, "error": str(exc)}
 
-async def run():
-    domains = [f"{root}{tld}" for root in NAME_ROOTS for tld in TLDS]
 
-    print(f"\n{BOLD}Checking {len(domains)} domains across "
-          f"{len(NAME_ROOTS)} names × {len(TLDS)} TLDs ...{RESET}\n")
+def load_cache() -> dict:
+    """Return {domain: {"checked_at": ts, "result": {...}}} with stale entries dropped."""
+    try:
+        cache = orjson.loads(CACHE_PATH.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+    cutoff = time.time() - CACHE_TTL
+    return {d: e for d, e in cache.items() if e.get("checked_at", 0) > cutoff}
 
-    semaphore = asyncio.Semaphore(CONCURRENCY)
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY)
 
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks   = [check_domain(session, d, semaphore) for d in domains]
-        results = await asyncio.gather(*tasks)
+def save_cache(cache: dict):
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_PATH.write_bytes(orjson.dumps(cache))
+    except OSError as exc:
+        print(f"{YELLOW}Warning:{RESET} could not write cache: {exc}")
+
+
+async def run():
+    # dict.fromkeys drops duplicates (repeated roots) while keeping order
+    domains = list(dict.fromkeys(f"{root}{tld}" for root in NAME_ROOTS for tld in TLDS))
+
+    cache   = load_cache()
+    pending = [d for d in domains if d not in cache]
+
+    print(f"\n{BOLD}Checking {len(domains)} domains across "
+          f"{len(NAME_ROOTS)} names × {len(TLDS)} TLDs "
+          f"({len(domains) - len(pending)} cached) ...{RESET}\n")
+
+    # Connector caps in-flight requests and keeps connections / DNS warm
+    connector = aiohttp.TCPConnector(
+        limit=CONCURRENCY,
+        limit_per_host=CONCURRENCY,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    # Socket-level timeouts so time spent queued for a connection doesn't count
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=12, sock_read=12)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks   = [check_domain(session, d) for d in pending]
+        fetched = await asyncio.gather(*tasks)
+
+    # Only cache definite answers - errors and timeouts are retried next run
+    now = time.time()
+    for r in fetched:
+        if not r["error"]:
+            cache[r["domain"]] = {"checked_at": now, "result": r}
+    if fetched:
+        save_cache(cache)
+
+    by_domain = {r["domain"]: r for r in fetched}
+    results   = [by_domain[d] if d in by_domain else cache[d]["result"] for d in domains]
 
     available = [r for r in results if r["available"] is True]
     taken     = [r for r in results if r["available"] is False and not r["error"]]
@@ -1,4 +1,9 @@
+from collections import Counter
+
+
 class Cat:
+    __slots__ = ("name", "age")
+
     def __init__(self, name, age):
         self.name = name
         self.age = age
@@ -17,17 +22,22 @@ Cat1.lives()
 
 
 class Cart:
+    __slots__ = ("items",)
+
     def __init__(self):
-        self.items = []
+        # item -> quantity, so add/remove are O(1)
+        self.items = Counter()
 
     def add(self, item):
-        self.items.append(item)
+        self.items[item] += 1
     
     def remove(self, item):
-        if item in self.items:
-            self.items.remove(item)
+        if self.items[item]:
+            self.items[item] -= 1
+            if not self.items[item]:
+                del self.items[item]
         else:
             print(f"{item} not in cart")
 
     def view(self):
-        print(self.items)
\ No newline at end of file
+        print(list(self.items.elements()))
\ No newline at end of file
@@ -0,0 +1,183 @@
+-- Migration: Inbound message RPCs
+-- Created: 2026-10-15
+-- Description: Collapses the per-message Supabase round-trips of the
+-- WebSocket handler (tenant lookup, idempotency check, message insert,
+-- session upsert, pause check, processed_events insert) into two RPCs.
+
+-- ============================================================================
+-- PROCESS_INBOUND_MESSAGE
+-- ============================================================================
+-- Runs in one transaction:
+--   1. Resolve tenant by instance_name
+--   2. Claim the event in processed_events (ON CONFLICT DO NOTHING = duplicate)
+--   3. Store the inbound message
+--   4. Upsert the session, pausing it when p_pause is set
+--   5. Report whether the session is paused
+--
+-- Returns jsonb:
+--   {"status": "unknown_instance"}
+--   {"status": "duplicate" | "paused" | "ignored_paused" | "stored" | "proceed",
+--    "tenant": {id, instance_name, evo_server_url, system_prompt, llm_provider}
+--              (null when p_tenant_id was passed),
+--    "is_paused": bool}
+--
+-- The claimed processed_events row is left as 'in_flight' for "proceed";
+-- call finalize_event() with the final action once the reply is handled.
+
+CREATE OR REPLACE FUNCTION process_inbound_message(
+    p_instance TEXT,
+    p_message_id TEXT,
+    p_event TEXT,
+    p_chat_id TEXT,
+    p_from_me BOOLEAN,
+    p_text TEXT,
+    p_msg_type TEXT,
+    p_raw JSONB,
+    p_pause BOOLEAN DEFAULT FALSE,
+    p_tenant_id INTEGER DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_tenant tenants%ROWTYPE;
+    v_tenant_json JSONB;
+    v_claimed INTEGER;
+    v_is_paused BOOLEAN;
+    v_status TEXT;
+BEGIN
+    -- Callers that already have the tenant cached pass p_tenant_id to skip
+    -- the lookup; the tenant is then not echoed back
+    IF p_tenant_id IS NOT NULL THEN
+        v_tenant.id := p_tenant_id;
+    ELSE
+        SELECT * INTO v_tenant FROM tenants WHERE instance_name = p_instance LIMIT 1;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('status', 'unknown_instance');
+        END IF;
+
+        v_tenant_json := jsonb_build_object(
+            'id', v_tenant.id,
+            'instance_name', v_tenant.instance_name,
+            'evo_server_url', v_tenant.evo_server_url,
+            'system_prompt', v_tenant.system_prompt,
+            'llm_provider', v_tenant.llm_provider
+        );
+    END IF;
+
+    -- Atomic idempotency claim
+    INSERT INTO processed_events (tenant_id, message_id, event_type, action_taken)
+    VALUES (v_tenant.id, p_message_id, p_event, 'in_flight')
+    ON CONFLICT (tenant_id, message_id, event_type) DO NOTHING
+    RETURNING id INTO v_claimed;
+
+    IF v_claimed IS NULL THEN
+        RETURN jsonb_build_object('status', 'duplicate', 'tenant', v_tenant_json);
+    END IF;
+
+    INSERT INTO messages (tenant_id, chat_id, message_id, from_me, message_type, text, raw)
+    VALUES (v_tenant.id, p_chat_id, p_message_id, p_from_me,
+            COALESCE(p_msg_type, 'conversation'), p_text, p_raw)
+    ON CONFLICT (tenant_id, message_id) DO NOTHING;
+
+    IF p_pause THEN
+        INSERT INTO sessions (tenant_id, chat_id, last_message_at, is_paused, pause_reason, last_human_at)
+        VALUES (v_tenant.id, p_chat_id, NOW(), TRUE, 'human_intervention', NOW())
+        ON CONFLICT (tenant_id, chat_id) DO UPDATE SET
+            last_message_at = EXCLUDED.last_message_at,
+            is_paused = TRUE,
+            pause_reason = EXCLUDED.pause_reason,
+            last_human_at = EXCLUDED.last_human_at,
+            updated_at = NOW()
+        RETURNING is_paused INTO v_is_paused;
+        v_status := 'paused';
+    ELSE
+        INSERT INTO sessions (tenant_id, chat_id, last_message_at)
+        VALUES (v_tenant.id, p_chat_id, NOW())
+        ON CONFLICT (tenant_id, chat_id) DO UPDATE SET
+            last_message_at = EXCLUDED.last_message_at,
+            updated_at = NOW()
+        RETURNING is_paused INTO v_is_paused;
+        v_status := CASE
+            WHEN COALESCE(v_is_paused, FALSE) THEN 'ignored_paused'
+            WHEN p_from_me IS FALSE THEN 'proceed'
+            ELSE 'stored'  -- own message that doesn't pause: nothing to reply to
+        END;
+    END IF;
+
+    IF v_status <> 'proceed' THEN
+        UPDATE processed_events SET action_taken = v_status WHERE id = v_claimed;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'status', v_status,
+        'tenant', v_tenant_json,
+        'is_paused', COALESCE(v_is_paused, FALSE)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION process_inbound_message IS 'Resolve tenant, claim event, store message and upsert session in one call';
+
+
+-- ============================================================================
+-- FINALIZE_EVENT
+-- ============================================================================
+-- Records the final action for a claimed event and, when a reply was sent,
+-- stores the outbound message in the same transaction.
+
+CREATE OR REPLACE FUNCTION finalize_event(
+    p_tenant_id INTEGER,
+    p_message_id TEXT,
+    p_event TEXT,
+    p_action TEXT,
+    p_chat_id TEXT DEFAULT NULL,
+    p_reply_text TEXT DEFAULT NULL,
+    p_raw JSONB DEFAULT NULL
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO processed_events (tenant_id, message_id, event_type, action_taken)
+    VALUES (p_tenant_id, p_message_id, p_event, p_action)
+    ON CONFLICT (tenant_id, message_id, event_type) DO UPDATE SET
+        action_taken = EXCLUDED.action_taken,
+        processed_at = NOW();
+
+    IF p_reply_text IS NOT NULL THEN
+        INSERT INTO messages (tenant_id, chat_id, message_id, from_me, message_type, text, raw)
+        VALUES (p_tenant_id, p_chat_id, 'out-' || p_message_id, TRUE, 'conversation', p_reply_text, p_raw)
+        ON CONFLICT (tenant_id, message_id) DO NOTHING;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION finalize_event IS 'Record final event action and optional outbound reply in one call';
+
+
+-- ============================================================================
+-- FINALIZE_EVENTS (batch)
+-- ============================================================================
+-- Applies finalize_event() to a JSON array of events so the handler can
+-- flush queued results in one call. Each element has the finalize_event
+-- parameter names without the p_ prefix.
+
+CREATE OR REPLACE FUNCTION finalize_events(p_events JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_event JSONB;
+BEGIN
+    FOR v_event IN SELECT * FROM jsonb_array_elements(p_events) LOOP
+        PERFORM finalize_event(
+            (v_event->>'tenant_id')::INTEGER,
+            v_event->>'message_id',
+            v_event->>'event_type',
+            v_event->>'action_taken',
+            v_event->>'chat_id',
+            v_event->>'reply_text',
+            v_event->'raw'
+        );
+    END LOOP;
+
+    RETURN jsonb_array_length(p_events);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION finalize_events IS 'Batch variant of finalize_event for queued flushes';
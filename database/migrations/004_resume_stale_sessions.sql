@@ -0,0 +1,32 @@
+-- Migration: Atomic session auto-resume
+-- Created: 2026-10-15
+-- Description: Resumes stale paused sessions with a single UPDATE ... RETURNING
+-- so scripts/auto_resume.py no longer needs a separate SELECT (and the race
+-- between reading and updating the same rows goes away).
+
+-- ============================================================================
+-- RESUME_STALE_SESSIONS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION resume_stale_sessions(p_cutoff TIMESTAMPTZ)
+RETURNS TABLE (
+    id INTEGER,
+    tenant_id INTEGER,
+    chat_id VARCHAR,
+    last_human_at TIMESTAMPTZ
+) AS $$
+    UPDATE sessions
+    SET
+        is_paused = FALSE,
+        pause_reason = NULL,
+        updated_at = NOW()
+    WHERE
+        is_paused = TRUE
+        AND last_human_at < p_cutoff
+    RETURNING sessions.id, sessions.tenant_id, sessions.chat_id, sessions.last_human_at;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION resume_stale_sessions IS 'Resume sessions paused before the cutoff and return the resumed rows';
+
+-- Example usage:
+-- SELECT * FROM resume_stale_sessions(NOW() - INTERVAL '2 hours');
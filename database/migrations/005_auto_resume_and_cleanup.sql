@@ -0,0 +1,46 @@
+-- Migration: Combined auto-resume and cleanup
+-- Created: 2026-10-15
+-- Description: Runs resume_stale_sessions() (004) and the processed_events
+-- cleanup DELETE in one transaction so scripts/auto_resume.py makes a single
+-- call per run instead of two.
+
+-- ============================================================================
+-- AUTO_RESUME_AND_CLEANUP
+-- ============================================================================
+-- Returns jsonb:
+--   {"resumed": int, "deleted": int,
+--    "sessions": [{id, tenant_id, chat_id, last_human_at}, ...]}
+
+CREATE OR REPLACE FUNCTION auto_resume_and_cleanup(
+    p_resume_cutoff TIMESTAMPTZ,
+    p_cleanup_cutoff TIMESTAMPTZ
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_sessions JSONB;
+    v_deleted INTEGER;
+BEGIN
+    -- Resume via resume_stale_sessions() (migration 004)
+    SELECT COALESCE(jsonb_agg(to_jsonb(resumed)), '[]'::jsonb)
+    INTO v_sessions
+    FROM resume_stale_sessions(p_resume_cutoff) AS resumed;
+
+    WITH deleted AS (
+        DELETE FROM processed_events
+        WHERE processed_at < p_cleanup_cutoff
+        RETURNING 1
+    )
+    SELECT COUNT(*) INTO v_deleted FROM deleted;
+
+    RETURN jsonb_build_object(
+        'resumed', jsonb_array_length(v_sessions),
+        'deleted', v_deleted,
+        'sessions', v_sessions
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION auto_resume_and_cleanup IS 'Resume stale paused sessions and delete old processed events in one transaction';
+
+-- Example usage:
+-- SELECT auto_resume_and_cleanup(NOW() - INTERVAL '2 hours', NOW() - INTERVAL '7 days');
@@ -0,0 +1,41 @@
+-- Migration: Atomic tenant assignment
+-- Created: 2026-10-15
+-- Description: Assigns tenants to a user (user_tenants row + tenants.owner_user_id)
+-- in one transaction so scripts/bootstrap_admin.py needs a single call and the
+-- two tables can't disagree on ownership.
+
+-- ============================================================================
+-- ASSIGN_TENANT_TO_USER
+-- ============================================================================
+-- Tenants the user already has a user_tenants row for are left untouched.
+-- Returns the ids of the newly assigned tenants.
+
+CREATE OR REPLACE FUNCTION assign_tenant_to_user(
+    p_user_id TEXT,
+    p_tenant_ids INTEGER[]
+)
+RETURNS INTEGER[] AS $$
+DECLARE
+    v_assigned INTEGER[];
+BEGIN
+    WITH inserted AS (
+        INSERT INTO user_tenants (user_id, tenant_id, role)
+        SELECT p_user_id, tenant_id, 'owner'
+        FROM unnest(p_tenant_ids) AS tenant_id
+        ON CONFLICT (user_id, tenant_id) DO NOTHING
+        RETURNING user_tenants.tenant_id
+    )
+    SELECT COALESCE(array_agg(tenant_id), '{}') INTO v_assigned FROM inserted;
+
+    UPDATE tenants
+    SET owner_user_id = p_user_id
+    WHERE id = ANY(v_assigned);
+
+    RETURN v_assigned;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION assign_tenant_to_user IS 'Make a user owner of the given tenants (user_tenants + owner_user_id) in one transaction';
+
+-- Example usage:
+-- SELECT assign_tenant_to_user('user-id', ARRAY[1, 2, 3]);
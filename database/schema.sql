@@ -109,7 +109,7 @@ CREATE INDEX IF NOT EXISTS idx_processed_events_processed_at ON processed_events
 COMMENT ON TABLE processed_events IS 'Tracks processed webhook events for idempotency';
 COMMENT ON COLUMN processed_events.message_id IS 'Message ID from webhook';
 COMMENT ON COLUMN processed_events.event_type IS 'Event type (e.g., messages.upsert)';
-COMMENT ON COLUMN processed_events.action_taken IS 'Action taken (paused, ai_replied, ignored_paused, etc)';
+COMMENT ON COLUMN processed_events.action_taken IS 'Action taken (in_flight while processing, then paused, ai_replied, ignored_paused, skipped_no_text, stored, etc)';
 COMMENT ON COLUMN processed_events.processed_at IS 'When this event was processed (for cleanup)';
 
 
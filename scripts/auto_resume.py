@@ -35,6 +35,11 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 RESUME_AFTER_HOURS = int(os.getenv("RESUME_AFTER_HOURS", "2"))
+CLEANUP_AFTER_DAYS = 7
+
+# Above this many resumed sessions, log only a sample instead of every row
+LOG_ALL_SESSIONS_LIMIT = 100
+LOG_SAMPLE_SIZE = 10
 
 
 def auto_resume_sessions():
@@ -53,48 +58,50 @@ def auto_resume_sessions():
     supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
     # Calculate cutoff time
-    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=RESUME_AFTER_HOURS)
+    now = datetime.now(timezone.utc)
+    cutoff_time = now - timedelta(hours=RESUME_AFTER_HOURS)
     cutoff_iso = cutoff_time.isoformat()
+    cleanup_cutoff_iso = (now - timedelta(days=CLEANUP_AFTER_DAYS)).isoformat()
 
     print(f"Auto-resuming sessions paused before {cutoff_iso} ({RESUME_AFTER_HOURS} hours ago)")
 
     try:
-        # Query sessions that should be resumed
-        sessions_to_resume = supabase.table("sessions").select(
-            "id, tenant_id, chat_id, last_human_at"
-        ).eq("is_paused", True).lt("last_human_at", cutoff_iso).execute()
-
-        if not sessions_to_resume.data:
+        # Resume stale sessions and clean up old processed_events in one
+        # transaction (see database/migrations/005_auto_resume_and_cleanup.sql)
+        result = supabase.rpc("auto_resume_and_cleanup", {
+            "p_resume_cutoff": cutoff_iso,
+            "p_cleanup_cutoff": cleanup_cutoff_iso,
+        }).execute()
+
+        summary = result.data or {}
+        resumed_count = summary.get("resumed", 0)
+        deleted_count = summary.get("deleted", 0)
+
+        if resumed_count == 0:
             print("No sessions to resume")
-            return 0
-
-        # Log sessions that will be resumed
-        print(f"Found {len(sessions_to_resume.data)} sessions to resume:")
-        for session in sessions_to_resume.data:
-            print(f"  - Session {session['id']}: tenant_id={session['tenant_id']}, "
-                  f"chat_id={session['chat_id']}, last_human_at={session['last_human_at']}")
-
-        # Update sessions to resume them
-        result = supabase.table("sessions").update({
-            "is_paused": False,
-            "pause_reason": None,
-        }).eq("is_paused", True).lt("last_human_at", cutoff_iso).execute()
-
-        resumed_count = len(result.data) if result.data else 0
-        print(f"✓ Successfully resumed {resumed_count} sessions")
-
-        # Also clean up old processed_events (if table exists)
-        try:
-            cleanup_cutoff = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-            cleanup_result = supabase.table("processed_events").delete().lt(
-                "processed_at", cleanup_cutoff
-            ).execute()
-            deleted_count = len(cleanup_result.data) if cleanup_result.data else 0
-            if deleted_count > 0:
-                print(f"✓ Cleaned up {deleted_count} old processed events (>7 days)")
-        except Exception as e:
-            # Table might not exist yet, that's okay
-            print(f"Note: Could not clean up processed_events: {e}")
+        else:
+            # Log sessions that were resumed - only a sample on large sweeps,
+            # written in one call rather than a print() per row
+            sessions = summary.get("sessions", [])
+            if len(sessions) > LOG_ALL_SESSIONS_LIMIT:
+                header = f"Resumed {resumed_count} sessions (showing first {LOG_SAMPLE_SIZE}):"
+                sessions = sessions[:LOG_SAMPLE_SIZE]
+            else:
+                header = f"Resumed {resumed_count} sessions:"
+
+            lines = [header]
+            lines.extend(
+                f"  - Session {session['id']}: tenant_id={session['tenant_id']}, "
+                f"chat_id={session['chat_id']}, last_human_at={session['last_human_at']}"
+                for session in sessions
+            )
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
+            print(f"✓ Successfully resumed {resumed_count} sessions")
+
+        if deleted_count > 0:
+            print(f"✓ Cleaned up {deleted_count} old processed events (>{CLEANUP_AFTER_DAYS} days)")
 
         return resumed_count
 
@@ -25,6 +25,8 @@ load_dotenv()
 
 from supabase import create_client
 
+from supabase_retry import retry
+
 
 async def bootstrap_admin(email: str, password: str, display_name: str = "Admin"):
     """
@@ -49,8 +51,12 @@ async def bootstrap_admin(email: str, password: str, display_name: str = "Admin"
 
     print(f"Creating admin user: {email}")
 
-    # 1. Check if user already exists
-    existing_user = client.table("users").select("id, email").eq("email", email).limit(1).execute()
+    # 1. Check if user already exists, fetching the tenants to assign (step 4)
+    # in parallel since they don't depend on the user
+    existing_user, tenants = await asyncio.gather(
+        asyncio.to_thread(retry, client.table("users").select("id, email").eq("email", email).limit(1).execute),
+        asyncio.to_thread(retry, client.table("tenants").select("id, instance_name").execute),
+    )
     if existing_user.data:
         print(f"User {email} already exists with id: {existing_user.data[0]['id']}")
         user_id = existing_user.data[0]["id"]
@@ -91,7 +97,7 @@ async def bootstrap_admin(email: str, password: str, display_name: str = "Admin"
             "is_active": True,
         }
 
-        user_result = client.table("users").insert(user_data).execute()
+        user_result = retry(client.table("users").insert(user_data).execute)
 
         if not user_result.data:
             raise ValueError("Failed to create user profile in users table")
@@ -99,8 +105,7 @@ async def bootstrap_admin(email: str, password: str, display_name: str = "Admin"
         user_id = user_result.data[0]["id"]
         print(f"Created user profile: {user_id}")
 
-    # 4. Get all existing tenants
-    tenants = client.table("tenants").select("id, instance_name").execute()
+    # 4. Count existing tenants (fetched alongside the user lookup)
     tenant_count = len(tenants.data) if tenants.data else 0
 
     print(f"Found {tenant_count} existing tenants")
@@ -109,39 +114,27 @@ async def bootstrap_admin(email: str, password: str, display_name: str = "Admin"
         print("No tenants to assign. Admin user created successfully.")
         return {"user_id": user_id, "email": email, "tenants_assigned": 0}
 
-    # 5. Assign all tenants to admin user
-    assigned_count = 0
-    for tenant in tenants.data:
-        tenant_id = tenant["id"]
-        instance_name = tenant["instance_name"]
-
-        # Check if already assigned
-        existing = client.table("user_tenants").select("id").eq(
-            "user_id", user_id
-        ).eq("tenant_id", tenant_id).limit(1).execute()
-
-        if existing.data:
-            print(f"  - {instance_name} (id:{tenant_id}): Already assigned")
-            continue
-
-        # Create user_tenants record
-        try:
-            client.table("user_tenants").insert({
-                "user_id": user_id,
-                "tenant_id": tenant_id,
-                "role": "owner",
-            }).execute()
-
-            # Update tenant owner
-            client.table("tenants").update({
-                "owner_user_id": user_id
-            }).eq("id", tenant_id).execute()
+    # 5. Assign all tenants to admin user. The RPC inserts the user_tenants
+    # rows and sets tenants.owner_user_id atomically, skipping tenants that
+    # are already assigned, and returns the ones it assigned - so no separate
+    # existence check is needed (see database/migrations/006_assign_tenant_to_user.sql)
+    try:
+        result = retry(client.rpc("assign_tenant_to_user", {
+            "p_user_id": user_id,
+            "p_tenant_ids": [tenant["id"] for tenant in tenants.data],
+        }).execute)
+        newly_assigned = set(result.data or [])
+    except Exception as e:
+        print(f"  Failed to assign tenants - {e}")
+        raise
 
-            print(f"  - {instance_name} (id:{tenant_id}): Assigned as owner")
-            assigned_count += 1
+    for tenant in tenants.data:
+        if tenant["id"] in newly_assigned:
+            print(f"  - {tenant['instance_name']} (id:{tenant['id']}): Assigned as owner")
+        else:
+            print(f"  - {tenant['instance_name']} (id:{tenant['id']}): Already assigned")
 
-        except Exception as e:
-            print(f"  - {instance_name} (id:{tenant_id}): Failed to assign - {e}")
+    assigned_count = len(newly_assigned)
 
     print(f"\nBootstrap complete!")
     print(f"  User: {email}")
@@ -5,15 +5,17 @@ Seed Data Script for Whaply
 This script populates the database with sample data for development and testing.
 
 Usage:
-    python scripts/seed_data.py [--clean]
+    python scripts/seed_data.py [--clean] [--force]
 
 Options:
     --clean     Clear existing data before seeding (WARNING: destructive!)
+    --force     Seed even if the database already has the sample tenants
 
 Environment:
     Requires SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY in .env file
 """
 
+import asyncio
 import os
 import sys
 from datetime import datetime, timezone, timedelta
@@ -29,6 +31,8 @@ sys.path.insert(0, str(project_root))
 
 from dotenv import load_dotenv
 
+from supabase_retry import retry
+
 # Load environment variables
 load_dotenv(project_root / ".env")
 
@@ -42,8 +46,32 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
 
 def get_supabase_client():
     """Initialize Supabase client."""
+    import httpx
     from supabase import create_client
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+    supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+    # Swap PostgREST's default HTTP session for a pooled HTTP/2 one so every
+    # seed request reuses the same connection (retries cover dropped connects)
+    postgrest = supabase.postgrest
+    session = postgrest.session
+    postgrest.session = httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=3,
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=50,
+                keepalive_expiry=60.0,
+            ),
+        ),
+    )
+    session.close()
+
+    return supabase
 
 
 def now_utc():
@@ -51,6 +79,28 @@ def now_utc():
     return datetime.now(timezone.utc)
 
 
+# Rows per request when bulk inserting (keeps request bodies reasonable)
+BATCH_SIZE = 5000
+
+
+def insert_rows(supabase, table, rows, on_conflict):
+    """
+    Insert rows in batches, skipping ones that already exist.
+
+    Returns:
+        list: The newly inserted rows
+    """
+    inserted = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        result = retry(supabase.table(table).upsert(
+            rows[start:start + BATCH_SIZE],
+            on_conflict=on_conflict,
+            ignore_duplicates=True,
+        ).execute)
+        inserted.extend(result.data or [])
+    return inserted
+
+
 def clean_database(supabase):
     """Remove all existing data (use with caution!)."""
     print("\n🗑️  Cleaning existing data...")
@@ -60,22 +110,19 @@ def clean_database(supabase):
     for table in tables:
         try:
             # Delete all rows
-            supabase.table(table).delete().neq("id", -1).execute()
+            retry(supabase.table(table).delete().neq("id", -1).execute)
             print(f"   ✓ Cleared {table}")
         except Exception as e:
             print(f"   ✗ Failed to clear {table}: {e}")
 
 
-def seed_tenants(supabase):
-    """Seed tenant data."""
-    print("\n📦 Seeding tenants...")
-
-    tenants = [
-        {
-            "instance_name": "demo-instance",
-            "evo_server_url": "https://evolution-api.example.com",
-            "evo_api_key": "demo-api-key-12345",
-            "system_prompt": """You are a friendly and professional WhatsApp assistant for Demo Company.
+# Sample tenants created by seed_tenants
+SEED_TENANTS = [
+    {
+        "instance_name": "demo-instance",
+        "evo_server_url": "https://evolution-api.example.com",
+        "evo_api_key": "demo-api-key-12345",
+        "system_prompt": """You are a friendly and professional WhatsApp assistant for Demo Company.
 
 Your role:
 - Answer customer questions about products and services
@@ -88,13 +135,13 @@ Guidelines:
 - Use a friendly but professional tone
 - If unsure, offer to connect with a human agent
 - Never make up information about prices or availability""",
-            "llm_provider": "anthropic",
-        },
-        {
-            "instance_name": "support-bot",
-            "evo_server_url": "https://evolution-api.example.com",
-            "evo_api_key": "support-api-key-67890",
-            "system_prompt": """You are a technical support assistant for TechCorp.
+        "llm_provider": "anthropic",
+    },
+    {
+        "instance_name": "support-bot",
+        "evo_server_url": "https://evolution-api.example.com",
+        "evo_api_key": "support-api-key-67890",
+        "system_prompt": """You are a technical support assistant for TechCorp.
 
 Your responsibilities:
 - Help users troubleshoot common issues
@@ -103,13 +150,13 @@ Your responsibilities:
 - Direct users to relevant documentation
 
 Always be patient and thorough in your explanations.""",
-            "llm_provider": "anthropic",
-        },
-        {
-            "instance_name": "sales-assistant",
-            "evo_server_url": "https://evolution-api.example.com",
-            "evo_api_key": "sales-api-key-11111",
-            "system_prompt": """You are a sales assistant for Premium Services Inc.
+        "llm_provider": "anthropic",
+    },
+    {
+        "instance_name": "sales-assistant",
+        "evo_server_url": "https://evolution-api.example.com",
+        "evo_api_key": "sales-api-key-11111",
+        "system_prompt": """You are a sales assistant for Premium Services Inc.
 
 Your goals:
 - Answer questions about our service plans
@@ -118,29 +165,52 @@ Your goals:
 - Schedule demos with the sales team
 
 Be enthusiastic but not pushy. Focus on understanding customer needs.""",
-            "llm_provider": "openai",
-        },
-    ]
+        "llm_provider": "openai",
+    },
+]
 
-    inserted_tenants = []
-    for tenant in tenants:
-        try:
-            result = supabase.table("tenants").insert(tenant).execute()
-            if result.data:
-                inserted = result.data[0]
-                inserted_tenants.append(inserted)
-                print(f"   ✓ Created tenant: {inserted['instance_name']} (id: {inserted['id']})")
-        except Exception as e:
-            if "duplicate key" in str(e).lower():
-                # Fetch existing tenant
-                existing = supabase.table("tenants").select("*").eq(
-                    "instance_name", tenant["instance_name"]
-                ).limit(1).execute()
-                if existing.data:
-                    inserted_tenants.append(existing.data[0])
-                    print(f"   ⚠ Tenant exists: {tenant['instance_name']} (id: {existing.data[0]['id']})")
-            else:
-                print(f"   ✗ Failed to create tenant {tenant['instance_name']}: {e}")
+
+def _already_seeded(supabase):
+    """Check for the sample tenants with a count-only query (no rows transferred)."""
+    try:
+        result = retry(supabase.table("tenants").select("id", count="exact", head=True).in_(
+            "instance_name", [t["instance_name"] for t in SEED_TENANTS]
+        ).execute)
+    except Exception as e:
+        print(f"   ⚠ Could not check existing data: {e}")
+        return False
+    return (result.count or 0) >= len(SEED_TENANTS)
+
+
+def seed_tenants(supabase):
+    """Seed tenant data."""
+    print("\n📦 Seeding tenants...")
+
+    tenants = SEED_TENANTS
+
+    try:
+        created = insert_rows(supabase, "tenants", tenants, on_conflict="instance_name")
+        created_names = {t["instance_name"] for t in created}
+
+        if len(created) == len(tenants):
+            # Fresh database - the insert already returned every row
+            inserted_tenants = sorted(created, key=lambda t: t["id"])
+        else:
+            # Existing tenants are skipped by the insert (their config is
+            # left as-is) - fetch all in one query
+            result = retry(supabase.table("tenants").select("*").in_(
+                "instance_name", [t["instance_name"] for t in tenants]
+            ).order("id").execute)
+            inserted_tenants = result.data or []
+    except Exception as e:
+        print(f"   ✗ Failed to create tenants: {e}")
+        return []
+
+    for tenant in inserted_tenants:
+        if tenant["instance_name"] in created_names:
+            print(f"   ✓ Created tenant: {tenant['instance_name']} (id: {tenant['id']})")
+        else:
+            print(f"   ⚠ Tenant exists: {tenant['instance_name']} (id: {tenant['id']})")
 
     return inserted_tenants
 
@@ -166,6 +236,7 @@ def seed_sessions(supabase, tenants):
     ]
 
     sessions = []
+    now = now_utc()
 
     for i, phone in enumerate(phone_numbers):
         # Distribute across tenants
@@ -177,7 +248,7 @@ def seed_sessions(supabase, tenants):
 
         # Calculate timestamps
         hours_ago = i * 2
-        last_message = now_utc() - timedelta(hours=hours_ago)
+        last_message = now - timedelta(hours=hours_ago)
         last_human = last_message - timedelta(minutes=30) if is_paused else None
 
         session = {
@@ -190,20 +261,19 @@ def seed_sessions(supabase, tenants):
         }
         sessions.append(session)
 
-    inserted_sessions = []
-    for session in sessions:
-        try:
-            result = supabase.table("sessions").insert(session).execute()
-            if result.data:
-                inserted = result.data[0]
-                inserted_sessions.append(inserted)
-                status = "PAUSED" if inserted["is_paused"] else "ACTIVE"
-                print(f"   ✓ Created session: {inserted['chat_id'][:20]}... [{status}]")
-        except Exception as e:
-            if "duplicate key" in str(e).lower():
-                print(f"   ⚠ Session exists: {session['chat_id'][:20]}...")
-            else:
-                print(f"   ✗ Failed to create session: {e}")
+    try:
+        inserted_sessions = insert_rows(supabase, "sessions", sessions, on_conflict="tenant_id,chat_id")
+    except Exception as e:
+        print(f"   ✗ Failed to create sessions: {e}")
+        return []
+
+    for inserted in inserted_sessions:
+        status = "PAUSED" if inserted["is_paused"] else "ACTIVE"
+        print(f"   ✓ Created session: {inserted['chat_id'][:20]}... [{status}]")
+
+    skipped = len(sessions) - len(inserted_sessions)
+    if skipped:
+        print(f"   ⚠ {skipped} sessions already existed")
 
     return inserted_sessions
 
@@ -253,8 +323,10 @@ def seed_messages(supabase, tenants):
         ],
     ]
 
-    inserted_messages = []
+    messages = []
     phone_numbers = ["5511999991111", "5511999992222", "5511999993333", "5511999994444"]
+    now = now_utc()
+    msg_spacing = timedelta(minutes=2)
 
     for conv_idx, conversation in enumerate(conversations):
         tenant = tenants[conv_idx % len(tenants)]
@@ -262,11 +334,12 @@ def seed_messages(supabase, tenants):
         chat_id = f"{phone}@s.whatsapp.net"
 
         # Generate messages with realistic timestamps
-        base_time = now_utc() - timedelta(hours=conv_idx * 4)
+        msg_time = now - timedelta(hours=conv_idx * 4)
 
         for msg_idx, msg in enumerate(conversation):
-            # Each message 1-3 minutes apart
-            msg_time = base_time + timedelta(minutes=msg_idx * 2)
+            if msg_idx:
+                # Each message 2 minutes apart
+                msg_time += msg_spacing
 
             message = {
                 "tenant_id": tenant["id"],
@@ -290,14 +363,13 @@ def seed_messages(supabase, tenants):
                 },
                 "created_at": msg_time.isoformat(),
             }
+            messages.append(message)
 
-            try:
-                result = supabase.table("messages").insert(message).execute()
-                if result.data:
-                    inserted_messages.append(result.data[0])
-            except Exception as e:
-                if "duplicate key" not in str(e).lower():
-                    print(f"   ✗ Failed to create message: {e}")
+    try:
+        inserted_messages = insert_rows(supabase, "messages", messages, on_conflict="tenant_id,message_id")
+    except Exception as e:
+        print(f"   ✗ Failed to create messages: {e}")
+        return []
 
     print(f"   ✓ Created {len(inserted_messages)} messages across {len(conversations)} conversations")
     return inserted_messages
@@ -312,11 +384,12 @@ def seed_processed_events(supabase, tenants):
         return []
 
     events = []
+    now = now_utc()
     actions = ["ai_replied", "paused", "ignored_paused", "ai_replied", "ai_replied"]
 
     for i in range(10):
         tenant = tenants[i % len(tenants)]
-        event_time = now_utc() - timedelta(hours=i)
+        event_time = now - timedelta(hours=i)
 
         event = {
             "tenant_id": tenant["id"],
@@ -327,20 +400,35 @@ def seed_processed_events(supabase, tenants):
         }
         events.append(event)
 
-    inserted_events = []
-    for event in events:
-        try:
-            result = supabase.table("processed_events").insert(event).execute()
-            if result.data:
-                inserted_events.append(result.data[0])
-        except Exception as e:
-            if "duplicate key" not in str(e).lower():
-                print(f"   ✗ Failed to create processed event: {e}")
+    try:
+        inserted_events = insert_rows(
+            supabase, "processed_events", events, on_conflict="tenant_id,message_id,event_type"
+        )
+    except Exception as e:
+        print(f"   ✗ Failed to create processed events: {e}")
+        return []
 
     print(f"   ✓ Created {len(inserted_events)} processed events")
     return inserted_events
 
 
+async def seed_tenant_data(supabase, tenants):
+    """
+    Seed sessions, messages and processed events concurrently.
+
+    The three only depend on tenants, not on each other. supabase-py is
+    synchronous, so each phase runs in a worker thread.
+
+    Returns:
+        tuple: (sessions, messages, events) inserted by each phase
+    """
+    return await asyncio.gather(
+        asyncio.to_thread(seed_sessions, supabase, tenants),
+        asyncio.to_thread(seed_messages, supabase, tenants),
+        asyncio.to_thread(seed_processed_events, supabase, tenants),
+    )
+
+
 def print_summary(supabase):
     """Print summary of seeded data."""
     print("\n" + "=" * 50)
@@ -351,8 +439,9 @@ def print_summary(supabase):
 
     for table in tables:
         try:
-            result = supabase.table(table).select("*", count="exact").execute()
-            count = len(result.data) if result.data else 0
+            # Count-only request - no rows are transferred
+            result = retry(supabase.table(table).select("id", count="exact", head=True).execute)
+            count = result.count or 0
             print(f"   {table}: {count} rows")
         except Exception as e:
             print(f"   {table}: ERROR - {e}")
@@ -380,6 +469,11 @@ def main():
         action="store_true",
         help="Clear existing data before seeding (WARNING: destructive!)"
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Seed even if the database already has the sample tenants"
+    )
     args = parser.parse_args()
 
     print("=" * 50)
@@ -396,18 +490,22 @@ def main():
         sys.exit(1)
 
     # Clean if requested
+    cleaned = False
     if args.clean:
         confirm = input("\n⚠️  WARNING: This will delete ALL existing data. Continue? (yes/no): ")
         if confirm.lower() == "yes":
             clean_database(supabase)
+            cleaned = True
         else:
             print("   Skipping clean operation")
 
-    # Seed data
+    if not cleaned and not args.force and _already_seeded(supabase):
+        print("\n✓ Database already seeded - nothing to do (use --force to re-seed)")
+        return
+
+    # Seed data - tenants first, then everything that references them
     tenants = seed_tenants(supabase)
-    sessions = seed_sessions(supabase, tenants)
-    messages = seed_messages(supabase, tenants)
-    events = seed_processed_events(supabase, tenants)
+    sessions, messages, events = asyncio.run(seed_tenant_data(supabase, tenants))
 
     # Print summary
     print_summary(supabase)
@@ -0,0 +1,39 @@
+"""
+Retry helper for Supabase calls made by the scripts in this directory.
+
+Retries rate limits, server errors and dropped connections (see
+app/services/retryable.py) with exponential backoff and jitter; everything
+else is raised immediately.
+
+Usage:
+    from supabase_retry import retry
+
+    result = retry(supabase.table("tenants").select("*").execute)
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Project root, so the classification is shared with the app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.retryable import is_retryable
+
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 32.0
+
+
+def retry(fn, *, max_retries=MAX_RETRIES, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Call fn(), retrying retryable errors up to max_retries times."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = min(cap, base * 2 ** attempt) + random.uniform(0, 0.5)
+            print(f"  Request failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
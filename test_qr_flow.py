@@ -1,36 +1,83 @@
-from playwright.sync_api import sync_playwright
-import time
+import queue
+import threading
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+
+SCREENSHOT_DIR = Path('C:/Users/USER/wa_assist/screenshots')
+
+# Screenshots are encoded as JPEG and written to disk by a background thread
+# so the flow doesn't wait on file I/O
+_screenshots = queue.Queue()
+
+
+def _write_screenshots():
+    while True:
+        path, data = _screenshots.get()
+        try:
+            path.write_bytes(data)
+        except OSError as e:
+            # Keep draining - a dead writer would block every join() below
+            print(f"WARNING: Could not save screenshot {path}: {e}")
+        finally:
+            _screenshots.task_done()
+
+
+SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+threading.Thread(target=_write_screenshots, daemon=True).start()
+
+
+def screenshot(page, name, full_page=False):
+    """Queue a JPEG screenshot (viewport only unless full_page)."""
+    data = page.screenshot(type='jpeg', quality=70, full_page=full_page)
+    _screenshots.put((SCREENSHOT_DIR / f'{name}.jpg', data))
+
+
+def wait_for(page, selector, timeout=10000):
+    """Wait for selector to become visible; False on timeout (checked below)."""
+    try:
+        page.wait_for_selector(selector, state='visible', timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
 
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
-    page = browser.new_page()
+    browser = p.chromium.launch(headless=True, args=["--disable-dev-shm-usage"])
+    context = browser.new_context(viewport={"width": 1280, "height": 800})
+    # Skip network images and fonts - nothing here depends on them, and the QR
+    # code is an inline data: URL that never hits the network. CSS is kept so
+    # visibility checks and screenshots match what users see.
+    context.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2}", lambda route: route.abort())
+    page = context.new_page()
 
     # Step 1: Navigate to login page
     print("Step 1: Navigating to login page...")
-    page.goto('http://localhost:3001/login')
-    page.wait_for_load_state('networkidle')
-    page.screenshot(path='C:/Users/USER/wa_assist/screenshots/01_login_page.png', full_page=True)
+    page.goto('http://localhost:3001/login', wait_until='domcontentloaded')
+    wait_for(page, 'input[type="email"]')
+    screenshot(page, '01_login_page')
     print("Login page loaded")
 
     # Step 2: Fill in login credentials
     print("Step 2: Logging in...")
     page.fill('input[type="email"]', 'test@example.com')
     page.fill('input[type="password"]', 'testpassword123')
-    page.screenshot(path='C:/Users/USER/wa_assist/screenshots/02_login_filled.png', full_page=True)
+    screenshot(page, '02_login_filled')
 
     # Step 3: Submit login
     page.click('button[type="submit"]')
-    page.wait_for_load_state('networkidle')
-    time.sleep(2)
-    page.screenshot(path='C:/Users/USER/wa_assist/screenshots/03_after_login.png', full_page=True)
+    try:
+        page.wait_for_url(lambda url: '/login' not in url, timeout=10000)
+    except PlaywrightTimeoutError:
+        pass  # Still on login - the URL printed below shows it
+    screenshot(page, '03_after_login')
     print(f"After login, URL: {page.url}")
 
     # Step 4: Navigate to WhatsApp page
     print("Step 4: Navigating to WhatsApp page...")
-    page.goto('http://localhost:3001/instances')
-    page.wait_for_load_state('networkidle')
-    time.sleep(2)
-    page.screenshot(path='C:/Users/USER/wa_assist/screenshots/04_whatsapp_page.png', full_page=True)
+    page.goto('http://localhost:3001/instances', wait_until='domcontentloaded')
+    wait_for(page, 'button:has-text("Connect WhatsApp")')
+    screenshot(page, '04_whatsapp_page')
     print("WhatsApp page loaded")
 
     # Step 5: Click "Connect WhatsApp" button
@@ -38,14 +85,15 @@ with sync_playwright() as p:
     connect_btn = page.locator('button:has-text("Connect WhatsApp")').first
     if connect_btn.is_visible():
         connect_btn.click()
-        time.sleep(1)
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/05_connect_dialog.png', full_page=True)
+        wait_for(page, 'input#connection-name', timeout=5000)
+        screenshot(page, '05_connect_dialog')
         print("Connect dialog opened")
     else:
         print("ERROR: Connect WhatsApp button not found")
         # Take a screenshot to debug
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/05_error_no_button.png', full_page=True)
+        screenshot(page, '05_error_no_button', full_page=True)
         browser.close()
+        _screenshots.join()
         exit(1)
 
     # Step 6: Enter connection name
@@ -53,12 +101,13 @@ with sync_playwright() as p:
     name_input = page.locator('input#connection-name')
     if name_input.is_visible():
         name_input.fill('test-browser-qr')
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/06_name_entered.png', full_page=True)
+        screenshot(page, '06_name_entered')
         print("Name entered")
     else:
         print("ERROR: Connection name input not found")
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/06_error_no_input.png', full_page=True)
+        screenshot(page, '06_error_no_input', full_page=True)
         browser.close()
+        _screenshots.join()
         exit(1)
 
     # Step 7: Click "Get QR Code" button
@@ -66,15 +115,23 @@ with sync_playwright() as p:
     qr_btn = page.locator('button:has-text("Get QR Code")')
     if qr_btn.is_visible():
         qr_btn.click()
-        # Wait for the QR code to load
+        # Wait until the QR image has actually decoded, not just been inserted
         print("Waiting for QR code response...")
-        time.sleep(8)
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/07_qr_code_result.png', full_page=True)
+        try:
+            page.wait_for_function(
+                "() => { const img = document.querySelector('img[alt=\"WhatsApp QR Code\"]');"
+                " return img && img.complete && img.naturalWidth > 50; }",
+                timeout=15000,
+            )
+        except PlaywrightTimeoutError:
+            pass  # Step 8 reports what rendered instead
+        screenshot(page, '07_qr_code_result')
         print("QR code step complete")
     else:
         print("ERROR: Get QR Code button not found")
-        page.screenshot(path='C:/Users/USER/wa_assist/screenshots/07_error_no_qr_btn.png', full_page=True)
+        screenshot(page, '07_error_no_qr_btn', full_page=True)
         browser.close()
+        _screenshots.join()
         exit(1)
 
     # Step 8: Check if QR code image rendered
@@ -111,11 +168,12 @@ with sync_playwright() as p:
             print(f"  Image {i}: alt='{alt}', src='{src}'")
 
     # Final screenshot
-    page.screenshot(path='C:/Users/USER/wa_assist/screenshots/08_final_state.png', full_page=True)
+    screenshot(page, '08_final_state', full_page=True)
 
     # Cleanup: try to delete the test instance
     print("\nCleaning up test instance...")
     # We'll do this via API since we're already done with the UI test
 
     browser.close()
-    print("\nTest complete! Check screenshots in C:/Users/USER/wa_assist/screenshots/")
+    _screenshots.join()
+    print(f"\nTest complete! Check screenshots in {SCREENSHOT_DIR}/")
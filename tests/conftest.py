@@ -0,0 +1,13 @@
+"""
+Shared pytest setup.
+
+app.db builds the Supabase client at import time, so placeholder
+credentials are set before any app module is imported. Redis is disabled
+so cache tests only exercise the in-process layer.
+"""
+
+import os
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test.service.role-key")
+os.environ["REDIS_URL"] = ""
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.services import evolution_client
+from app.services.evolution_client import _single_flight
+
+
+@pytest.fixture(autouse=True)
+def clear_state_cache():
+    evolution_client._STATE_CACHE.clear()
+    evolution_client._STATE_INFLIGHT.clear()
+    yield
+    evolution_client._STATE_CACHE.clear()
+    evolution_client._STATE_INFLIGHT.clear()
+
+
+def counting_fetch(result=None, delay=0.01):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result if result is not None else {"state": "open"}
+
+    return fetch, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    fetch, calls = counting_fetch()
+
+    results = await asyncio.gather(*(_single_flight("tenant:1", fetch) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert results == [{"state": "open"}] * 5
+
+
+@pytest.mark.asyncio
+async def test_result_is_reused_within_ttl():
+    fetch, calls = counting_fetch()
+
+    await _single_flight("tenant:1", fetch)
+    await _single_flight("tenant:1", fetch)
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_result_is_fetched_again(monkeypatch):
+    monkeypatch.setattr(evolution_client, "_STATE_CACHE_TTL", 0.0)
+    fetch, calls = counting_fetch()
+
+    await _single_flight("tenant:1", fetch)
+    await _single_flight("tenant:1", fetch)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_keys_are_independent():
+    fetch, calls = counting_fetch()
+
+    await asyncio.gather(_single_flight("tenant:1", fetch), _single_flight("tenant:2", fetch))
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached():
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return {"state": "open"}
+
+    with pytest.raises(RuntimeError):
+        await _single_flight("tenant:1", fetch)
+
+    assert await _single_flight("tenant:1", fetch) == {"state": "open"}
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_fetch():
+    fetch, calls = counting_fetch(delay=0.05)
+
+    first = asyncio.ensure_future(_single_flight("tenant:1", fetch))
+    second = asyncio.ensure_future(_single_flight("tenant:1", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == {"state": "open"}
+    assert len(calls) == 1
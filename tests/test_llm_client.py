@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from app import config
+from app.services import llm_client
+from app.services.llm_client import generate_cached_reply
+from app.services.llm_providers.base import BaseLLMProvider
+
+
+class FakeProvider(BaseLLMProvider):
+    def __init__(self, model="fake-model", delay=0.0):
+        self.model = model
+        self.delay = delay
+        self.calls = []
+
+    async def generate_reply(self, message, system_prompt, context=None, max_tokens=None, temperature=0.7):
+        self.calls.append((message, system_prompt, context))
+        await asyncio.sleep(self.delay)
+        return f"reply {len(self.calls)}"
+
+    def get_provider_name(self):
+        return "fake"
+
+    def get_model_name(self):
+        return self.model
+
+
+@pytest.fixture(autouse=True)
+def reply_cache(monkeypatch):
+    monkeypatch.setattr(config, "LLM_REPLY_CACHE_TTL", 600)
+    monkeypatch.setattr(config, "LLM_REPLY_CACHE_MIN_CHARS", 12)
+    llm_client._REPLY_CACHE.clear()
+    llm_client._REPLY_INFLIGHT.clear()
+    yield
+    llm_client._REPLY_CACHE.clear()
+    llm_client._REPLY_INFLIGHT.clear()
+
+
+QUESTION = "What are your opening hours?"
+
+
+@pytest.mark.asyncio
+async def test_identical_message_is_served_from_cache():
+    provider = FakeProvider()
+
+    first = await generate_cached_reply(provider, 1, QUESTION, "prompt")
+    second = await generate_cached_reply(provider, 1, "  what are your OPENING hours?  ", "prompt")
+
+    assert first == second == "reply 1"
+    assert len(provider.calls) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("tenant_id, model, system_prompt", [
+    (2, "fake-model", "prompt"),
+    (1, "other-model", "prompt"),
+    (1, "fake-model", "other prompt"),
+])
+async def test_key_covers_tenant_model_and_prompt(tenant_id, model, system_prompt):
+    provider = FakeProvider()
+    await generate_cached_reply(provider, 1, QUESTION, "prompt")
+
+    provider.model = model
+    await generate_cached_reply(provider, tenant_id, QUESTION, system_prompt)
+
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_reply_is_regenerated(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(llm_client.time, "monotonic", lambda: now)
+    provider = FakeProvider()
+
+    await generate_cached_reply(provider, 1, QUESTION, "prompt")
+    now += config.LLM_REPLY_CACHE_TTL + 1
+    reply = await generate_cached_reply(provider, 1, QUESTION, "prompt")
+
+    assert reply == "reply 2"
+
+
+@pytest.mark.asyncio
+async def test_short_messages_bypass_cache():
+    provider = FakeProvider()
+
+    await generate_cached_reply(provider, 1, "yes", "prompt")
+    await generate_cached_reply(provider, 1, "yes", "prompt")
+
+    assert len(provider.calls) == 2
+    assert llm_client._REPLY_CACHE == {}
+
+
+@pytest.mark.asyncio
+async def test_context_bypasses_cache():
+    provider = FakeProvider()
+    context = [{"role": "user", "content": "Do you deliver?"}]
+
+    await generate_cached_reply(provider, 1, QUESTION, "prompt", context=context)
+    await generate_cached_reply(provider, 1, QUESTION, "prompt", context=context)
+
+    assert len(provider.calls) == 2
+    assert provider.calls[0][2] == context
+
+
+@pytest.mark.asyncio
+async def test_zero_ttl_disables_cache(monkeypatch):
+    monkeypatch.setattr(config, "LLM_REPLY_CACHE_TTL", 0)
+    provider = FakeProvider()
+
+    await generate_cached_reply(provider, 1, QUESTION, "prompt")
+    await generate_cached_reply(provider, 1, QUESTION, "prompt")
+
+    assert len(provider.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    provider = FakeProvider(delay=0.01)
+
+    replies = await asyncio.gather(*(
+        generate_cached_reply(provider, 1, QUESTION, "prompt") for _ in range(5)
+    ))
+
+    assert replies == ["reply 1"] * 5
+    assert len(provider.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_is_not_cached():
+    provider = FakeProvider()
+    original = provider.generate_reply
+
+    async def fail_once(*args, **kwargs):
+        provider.generate_reply = original
+        raise RuntimeError("rate limited")
+
+    provider.generate_reply = fail_once
+
+    with pytest.raises(RuntimeError):
+        await generate_cached_reply(provider, 1, QUESTION, "prompt")
+    assert await generate_cached_reply(provider, 1, QUESTION, "prompt") == "reply 1"
@@ -0,0 +1,38 @@
+import orjson
+import pytest
+
+from app.services.raw_socketio import _EIO_EVENT
+
+
+@pytest.mark.parametrize("packet, event, args", [
+    ('42["messages.upsert",{"id":1}]', "messages.upsert", [{"id": 1}]),
+    ('42/evolution,["messages.upsert",{"id":1}]', "messages.upsert", [{"id": 1}]),
+    ('4217["connection.update",{"state":"open"}]', "connection.update", [{"state": "open"}]),
+    ('42/evolution,17["connection.update",{"state":"open"}]', "connection.update", [{"state": "open"}]),
+    ('42["qrcode.updated"]', "qrcode.updated", []),
+    ('42["messages.upsert",{"text":"line one\\nline two"}]', "messages.upsert", [{"text": "line one\nline two"}]),
+    # Pretty-printed payloads span lines
+    ('42["messages.upsert",\n{"id":1}\n]', "messages.upsert", [{"id": 1}]),
+])
+def test_event_frames_match(packet, event, args):
+    match = _EIO_EVENT.match(packet)
+
+    assert match is not None
+    name, *payload = orjson.loads(match.group(1))
+    assert name == event
+    assert payload == args
+
+
+@pytest.mark.parametrize("packet", [
+    "2",                           # Engine.IO ping
+    "3",                           # Engine.IO pong
+    '0{"sid":"abc"}',              # Engine.IO open
+    '40{"sid":"abc"}',             # Socket.IO connect
+    "41",                          # Socket.IO disconnect
+    '43["ack"]',                   # Socket.IO ack
+    '44{"message":"denied"}',      # Socket.IO connect error
+    "42",                          # event without a payload
+    '42{"not":"an array"}',
+])
+def test_other_packets_do_not_match(packet):
+    assert _EIO_EVENT.match(packet) is None
@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services.pgrest_async import PgRestError
+from app.services.retryable import is_retryable
+
+
+def api_error(code, message="error"):
+    return APIError({"code": code, "message": message, "details": None, "hint": None})
+
+
+@pytest.mark.parametrize("exc", [
+    httpx.ConnectError("connection refused"),
+    httpx.ReadTimeout("timed out"),
+    api_error("PGRST000"),
+    api_error("PGRST003"),
+    api_error("08006"),             # connection failure
+    api_error("53300"),             # too many connections
+    api_error("40001"),             # serialization failure
+    api_error("57P01"),             # admin shutdown
+    api_error(503),                 # non-JSON body: HTTP status in code
+    api_error("429"),
+    api_error(None, "Rate limit exceeded"),
+    PgRestError("unavailable", status_code=503),
+    PgRestError("too many", status_code=429),
+])
+def test_transient_errors_are_retryable(exc):
+    assert is_retryable(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    api_error("23505"),             # unique violation
+    api_error("23503"),             # foreign key violation
+    api_error("42883"),             # undefined function
+    api_error("PGRST202"),          # RPC not found
+    api_error(404),
+    api_error("400"),
+    api_error(None, "invalid input"),
+    PgRestError("not found", status_code=404, code="PGRST202"),
+    PgRestError("bad request", status_code=400),
+    ValueError("bad payload"),
+])
+def test_permanent_errors_are_not_retryable(exc):
+    assert not is_retryable(exc)
+
+
+def test_http_status_error_uses_response_status():
+    request = httpx.Request("POST", "http://localhost/rest/v1/rpc/finalize_events")
+
+    server_error = httpx.HTTPStatusError("", request=request, response=httpx.Response(502, request=request))
+    client_error = httpx.HTTPStatusError("", request=request, response=httpx.Response(422, request=request))
+
+    assert is_retryable(server_error)
+    assert not is_retryable(client_error)
@@ -0,0 +1,69 @@
+import pytest
+
+from app.services import tenant_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    tenant_cache._L1.clear()
+    tenant_cache._INSTANCES.clear()
+    tenant_cache._INSTANCE_BY_TENANT.clear()
+    yield
+    tenant_cache._L1.clear()
+    tenant_cache._INSTANCES.clear()
+    tenant_cache._INSTANCE_BY_TENANT.clear()
+
+
+def test_instance_lookup_misses_until_set():
+    assert tenant_cache.get_instance_tenant("demo") == (False, None)
+
+    tenant_cache.set_instance_tenant("demo", {"id": 1})
+
+    assert tenant_cache.get_instance_tenant("demo") == (True, {"id": 1})
+
+
+def test_unknown_instance_is_cached_as_none():
+    tenant_cache.set_instance_tenant("ghost", None)
+
+    assert tenant_cache.get_instance_tenant("ghost") == (True, None)
+
+
+def test_unknown_instance_expires_sooner(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(tenant_cache.time, "monotonic", lambda: now)
+    tenant_cache.set_instance_tenant("ghost", None)
+    tenant_cache.set_instance_tenant("demo", {"id": 1})
+
+    now += tenant_cache.UNKNOWN_INSTANCE_TTL + 1
+
+    assert tenant_cache.get_instance_tenant("ghost") == (False, None)
+    assert tenant_cache.get_instance_tenant("demo") == (True, {"id": 1})
+
+
+def test_forget_instance_returns_cached_tenant():
+    tenant_cache.set_instance_tenant("demo", {"id": 1})
+
+    assert tenant_cache.forget_instance("demo") == {"id": 1}
+    assert tenant_cache.get_instance_tenant("demo") == (False, None)
+    assert 1 not in tenant_cache._INSTANCE_BY_TENANT
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tenant_drops_instance_entry():
+    tenant_cache.set_instance_tenant("demo", {"id": 1, "system_prompt": "old"})
+    await tenant_cache.set_tenant_config(1, {"instance_name": "demo"})
+
+    await tenant_cache.invalidate_tenant(1)
+
+    assert tenant_cache.get_instance_tenant("demo") == (False, None)
+    assert await tenant_cache.get_tenant_config(1) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tenant_leaves_other_instances():
+    tenant_cache.set_instance_tenant("demo", {"id": 1})
+    tenant_cache.set_instance_tenant("support", {"id": 2})
+
+    await tenant_cache.invalidate_tenant(1)
+
+    assert tenant_cache.get_instance_tenant("support") == (True, {"id": 2})
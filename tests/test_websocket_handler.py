@@ -0,0 +1,125 @@
+import pytest
+
+from app.services import websocket_handler
+from app.services.pgrest_async import PgRestError
+
+
+def rows(*message_ids):
+    return [
+        {"tenant_id": 1, "message_id": message_id, "event_type": "messages.upsert", "action_taken": "ai_replied"}
+        for message_id in message_ids
+    ]
+
+
+@pytest.fixture
+def flush_calls(monkeypatch):
+    """Record batch writes, backoff sleeps and dropped-batch errors."""
+    calls = {"writes": 0, "sleeps": [], "errors": []}
+
+    async def fake_sleep(delay):
+        calls["sleeps"].append(delay)
+
+    monkeypatch.setattr(websocket_handler.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(websocket_handler, "log_warning", lambda *a, **k: None)
+    monkeypatch.setattr(websocket_handler, "log_error", lambda *a, **k: calls["errors"].append(k))
+    return calls
+
+
+def failing_writes(monkeypatch, calls, errors):
+    """Make _write_batch raise each error in turn, then succeed."""
+    errors = list(errors)
+
+    async def fake_write(batch):
+        calls["writes"] += 1
+        if errors:
+            raise errors.pop(0)
+
+    monkeypatch.setattr(websocket_handler, "_write_batch", fake_write)
+
+
+@pytest.mark.asyncio
+async def test_batch_written_first_time(monkeypatch, flush_calls):
+    failing_writes(monkeypatch, flush_calls, [])
+
+    assert await websocket_handler._write_batch_with_retry(rows("a", "b")) is True
+    assert flush_calls["writes"] == 1
+    assert flush_calls["sleeps"] == []
+
+
+@pytest.mark.asyncio
+async def test_transient_error_is_retried(monkeypatch, flush_calls):
+    failing_writes(monkeypatch, flush_calls, [PgRestError("unavailable", status_code=503)])
+
+    assert await websocket_handler._write_batch_with_retry(rows("a")) is True
+    assert flush_calls["writes"] == 2
+    assert len(flush_calls["sleeps"]) == 1
+    assert flush_calls["errors"] == []
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_drops_batch(monkeypatch, flush_calls):
+    missing_rpc = PgRestError("Could not find the function", status_code=404, code="PGRST202")
+    failing_writes(monkeypatch, flush_calls, [missing_rpc])
+
+    assert await websocket_handler._write_batch_with_retry(rows("a", "b")) is False
+    assert flush_calls["writes"] == 1
+    assert flush_calls["sleeps"] == []
+    assert flush_calls["errors"][0]["extra_data"]["message_ids"] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_stop_after_max_attempts(monkeypatch, flush_calls):
+    errors = [PgRestError("timeout", status_code=504)] * (websocket_handler._FLUSH_MAX_ATTEMPTS + 1)
+    failing_writes(monkeypatch, flush_calls, errors)
+
+    assert await websocket_handler._write_batch_with_retry(rows("a")) is False
+    assert flush_calls["writes"] == websocket_handler._FLUSH_MAX_ATTEMPTS
+    assert len(flush_calls["sleeps"]) == websocket_handler._FLUSH_MAX_ATTEMPTS - 1
+    assert flush_calls["errors"][0]["extra_data"]["attempts"] == websocket_handler._FLUSH_MAX_ATTEMPTS
+
+
+async def chunks(*fragments):
+    async def stream():
+        for fragment in fragments:
+            yield fragment
+
+    return [chunk async for chunk in websocket_handler._sentence_chunks(stream())]
+
+
+@pytest.mark.asyncio
+async def test_sentences_are_split_at_terminator_and_whitespace():
+    assert await chunks("Hello there.", " How can", " I help?", " Bye!") == [
+        "Hello there.", "How can I help?", "Bye!",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_terminator_inside_a_token_split_does_not_split():
+    assert await chunks("It costs $3.", "50 today.", " Want it?") == [
+        "It costs $3.50 today.", "Want it?",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_trailing_whitespace_on_fragment_ends_sentence():
+    assert await chunks("Done. ", "Next one.") == ["Done.", "Next one."]
+
+
+@pytest.mark.asyncio
+async def test_final_sentence_is_flushed_at_end_of_stream():
+    assert await chunks("No terminator here") == ["No terminator here"]
+
+
+@pytest.mark.asyncio
+async def test_empty_fragments_are_skipped():
+    assert await chunks("", "Hi.", "", " There.", "") == ["Hi.", "There."]
+
+
+@pytest.mark.asyncio
+async def test_long_text_is_flushed_at_max_chars():
+    fragment = "x" * 40
+    count = websocket_handler._STREAM_CHUNK_MAX_CHARS // len(fragment)
+
+    result = await chunks(*[fragment] * (count + 1))
+
+    assert result == [fragment * count, fragment]